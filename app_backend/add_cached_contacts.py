@@ -5,20 +5,37 @@
 import pandas as pd
 from datetime import datetime
 from app_backend.database import engine  # Absolute import
+from app_backend.migrations import apply_migrations, maintain_cache_indexes
+from app_backend.data_version import bump_data_version
+from app_backend.filter_options import rebuild_filter_option_values
+from app_backend.range_buckets import add_range_buckets
+
+def refresh_cached_contacts(db_engine=engine):
+    # Step 0: Pending migrations first (filter_option_values is rebuilt in Step 5)
+    apply_migrations(print, db_engine)
 
-def refresh_cached_contacts():
     # Step 1: Load data from the view
     query = "SELECT * FROM Vw_full_contacts_data"
-    df = pd.read_sql(query, engine)
+    df = pd.read_sql(query, db_engine)
 
     # Step 2: Add a last_updated column
     df['last_updated'] = datetime.now()
+    # Step 2b: empsize/annrev bucket codes used by the range filters
+    df = add_range_buckets(df)
 
     # Step 3: Replace existing cached table (use if_exists='replace' to avoid manually dropping the table)
-    with engine.begin() as conn:
+    with db_engine.begin() as conn:
         df.to_sql("cached_full_contacts_data", con=conn, index=False, if_exists="replace")
 
     print(f"✅ cached_full_contacts_data updated at {datetime.now()} with {len(df)} records.")
 
+    # Step 4: to_sql replace dropped the indexes; recreate them and refresh statistics
+    maintain_cache_indexes(print, db_engine)
+
+    # Step 5: Distinct filter values, then a new data version so in-process copies reload
+    with db_engine.begin() as conn:
+        rebuild_filter_option_values(conn)
+        bump_data_version(conn)
+
 if __name__ == "__main__":
     refresh_cached_contacts()
@@ -0,0 +1,162 @@
+# app_backend/bitmap_index.py
+
+### Bitmap indexes over the Explorer snapshot: one bitset of row positions per filter value ###
+
+import os
+import json
+import hashlib
+import numpy as np
+from filter_config import EMPSIZE_RANGES, ANNREV_RANGES
+
+BITMAP_COLUMNS = ["country", "compstate", "city", "industry", "emailstatus", "managementlevel"]
+BITMAP_RANGES = {"empsize": EMPSIZE_RANGES, "annrev": ANNREV_RANGES}
+# Part of the file name, so persisted indexes built with other bucket definitions are not reused
+RANGES_TAG = hashlib.sha1(json.dumps(BITMAP_RANGES, sort_keys=True).encode("utf-8")).hexdigest()[:8]
+
+# Values matching fewer than 1/SPARSE_RATIO of the rows keep a sorted position list
+# (4 bytes per row) instead of a packed bitset (1 bit per row)
+SPARSE_RATIO = 32
+SCAN_BLOCK_BYTES = 1 << 16
+
+CACHE_DIR = os.getenv("EXPLORER_CACHE_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache"))
+
+def _container(positions, n_rows):
+    """('pos', int32 positions) for sparse values, ('bits', packed uint8) for dense ones."""
+    if len(positions) * SPARSE_RATIO < n_rows:
+        return "pos", positions.astype(np.int32)
+    bits = np.zeros(n_rows, dtype=bool)
+    bits[positions] = True
+    return "bits", np.packbits(bits)
+
+class BitmapIndex:
+    """
+    Per-value bitmaps for the snapshot's row positions (rows are in id order).
+    IN filters OR the value bitmaps, filters on different columns AND them.
+    """
+
+    def __init__(self, n_rows, version, id_checksum, bitmaps):
+        self.n_rows = n_rows
+        self.version = version
+        self.id_checksum = id_checksum
+        self.bitmaps = bitmaps  # {(column, value): (kind, array)}
+        self.n_bytes = (n_rows + 7) // 8
+
+    @classmethod
+    def build(cls, snapshot):
+        n_rows = len(snapshot)
+        bitmaps = {}
+        for col in BITMAP_COLUMNS:
+            if col not in snapshot._codes:
+                continue
+            codes = snapshot._codes[col]
+            categories = snapshot.df[col].cat.categories
+            order = np.argsort(codes, kind="stable")
+            counts = np.bincount(codes + 1, minlength=len(categories) + 1)  # code -1 (NULL) first
+            bounds = np.cumsum(counts)
+            for code, value in enumerate(categories):
+                positions = order[bounds[code]:bounds[code + 1]]
+                if len(positions):
+                    bitmaps[(col, value)] = _container(positions, n_rows)
+        for col, ranges in BITMAP_RANGES.items():
+            if col not in snapshot._ranges:
+                continue
+            for label in ranges:
+                positions = np.flatnonzero(snapshot._range_mask(col, [label]))
+                bitmaps[(col, label)] = _container(positions, n_rows)
+        return cls(n_rows, snapshot.version, _id_checksum(snapshot.ids), bitmaps)
+
+    def to_bits(self, container):
+        kind, array = container
+        if kind == "bits":
+            return array
+        bits = np.zeros(self.n_rows, dtype=bool)
+        bits[array] = True
+        return np.packbits(bits)
+
+    def all_bits(self):
+        return np.packbits(np.ones(self.n_rows, dtype=bool))
+
+    def union(self, column, values):
+        """OR of the bitmaps for column IN values (an empty bitset when none exist)."""
+        result = np.zeros(self.n_bytes, dtype=np.uint8)
+        for value in values:
+            container = self.bitmaps.get((column, value))
+            if container is not None:
+                result |= self.to_bits(container)
+        return result
+
+    @staticmethod
+    def count(bits):
+        return int(np.bitwise_count(bits).sum())
+
+    def positions(self, bits, start=0, limit=None):
+        """Set row positions >= start, in order; scans block by block and stops after limit."""
+        found = []
+        remaining = limit
+        for byte_start in range(start // 8, self.n_bytes, SCAN_BLOCK_BYTES):
+            block = np.unpackbits(bits[byte_start:byte_start + SCAN_BLOCK_BYTES])
+            hits = np.flatnonzero(block) + byte_start * 8
+            hits = hits[(hits >= start) & (hits < self.n_rows)]
+            if remaining is not None:
+                hits = hits[:remaining]
+                remaining -= len(hits)
+            found.append(hits)
+            if remaining == 0:
+                break
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(found)
+
+    def to_mask(self, bits):
+        return np.unpackbits(bits, count=self.n_rows).astype(bool)
+
+    def save(self, path):
+        keys = list(self.bitmaps)
+        arrays = {f"b{i}": self.bitmaps[key][1] for i, key in enumerate(keys)}
+        meta = {
+            "n_rows": self.n_rows,
+            "version": self.version,
+            "id_checksum": self.id_checksum,
+            "keys": [[col, value, self.bitmaps[(col, value)][0]] for col, value in keys],
+        }
+        tmp_path = path + ".tmp.npz"
+        np.savez_compressed(tmp_path, meta=np.array(json.dumps(meta)), **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            bitmaps = {
+                (col, value): (kind, data[f"b{i}"])
+                for i, (col, value, kind) in enumerate(meta["keys"])
+            }
+        return cls(meta["n_rows"], meta["version"], meta["id_checksum"], bitmaps)
+
+def _id_checksum(ids):
+    return [int(len(ids)), int(ids.sum()) if len(ids) else 0]
+
+def index_path(version):
+    return os.path.join(CACHE_DIR, f"bitmap_index_v{version}_{RANGES_TAG}.npz")
+
+def load_or_build_bitmap_index(snapshot):
+    """Loads the persisted index for the snapshot's data version, or builds and persists it."""
+    path = index_path(snapshot.version)
+    if os.path.exists(path):
+        try:
+            index = BitmapIndex.load(path)
+            if index.n_rows == len(snapshot) and index.id_checksum == _id_checksum(snapshot.ids):
+                return index
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Ignoring unreadable bitmap index {path}: {e}")
+
+    index = BitmapIndex.build(snapshot)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        index.save(path)
+        for name in os.listdir(CACHE_DIR):
+            if name.startswith("bitmap_index_v") and name.endswith(".npz") and os.path.join(CACHE_DIR, name) != path:
+                os.remove(os.path.join(CACHE_DIR, name))
+    except OSError as e:
+        print(f"⚠️ Could not persist bitmap index: {e}")
+    return index
@@ -0,0 +1,46 @@
+# app_backend/data_version.py
+
+### Version counter for the contacts cache: bumped on every cache refresh so in-process copies can reload ###
+
+import threading
+import time
+from sqlalchemy import text
+from app_backend.database import engine
+
+VERSION_CHECK_TTL = 5  # seconds between version lookups per process
+
+_version_lock = threading.Lock()
+_cached_version = None
+_checked_at = 0.0
+
+def bump_data_version(conn):
+    """Increments the cache data version inside the caller's transaction; returns the new version."""
+    version = conn.execute(text("""
+        UPDATE cache_data_version
+        SET version = version + 1, refreshed_at = NOW()
+        WHERE id = 1
+        RETURNING version
+    """)).scalar()
+    invalidate_data_version()
+    return version
+
+def invalidate_data_version():
+    """Forces the next get_data_version() call to read the table."""
+    global _checked_at
+    with _version_lock:
+        _checked_at = 0.0
+
+def get_data_version():
+    """Current cache data version (0 before the first refresh), re-read at most every VERSION_CHECK_TTL seconds."""
+    global _cached_version, _checked_at
+    with _version_lock:
+        if _cached_version is not None and time.monotonic() - _checked_at < VERSION_CHECK_TTL:
+            return _cached_version
+
+    with engine.connect() as conn:
+        version = conn.execute(text("SELECT version FROM cache_data_version WHERE id = 1")).scalar()
+
+    with _version_lock:
+        _cached_version = version or 0
+        _checked_at = time.monotonic()
+        return _cached_version
@@ -0,0 +1,174 @@
+# app_backend/export.py
+
+### Streaming exports of filtered cache rows into temp files on disk (no row cap) ###
+### Query and file writing stay at one batch in memory; st.download_button still reads the ###
+### finished file into Streamlit's in-memory media store when it is served. ###
+
+import csv
+import gzip
+import io
+import os
+import zipfile
+from contextlib import contextmanager
+from datetime import date, datetime
+from decimal import Decimal
+from tempfile import NamedTemporaryFile
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import text
+from app_backend.database import engine
+
+EXPORT_BATCH_ROWS = 10_000
+
+@contextmanager
+def _export_file(suffix):
+    """
+    Named temp file for one export, so the page can reopen it as a BufferedReader (a type
+    st.download_button accepts). Closed on exit; removed again if the export fails.
+    """
+    out_file = NamedTemporaryFile(mode="w+b", suffix=suffix, delete=False)
+    try:
+        yield out_file
+    except BaseException:
+        out_file.close()
+        os.remove(out_file.name)
+        raise
+    out_file.close()
+
+@contextmanager
+def open_filtered_cursor(where_clause, params, order_by="companyname", batch_rows=EXPORT_BATCH_ROWS):
+    """
+    Server-side (named) cursor over the filtered cache rows. Yields the SQLAlchemy result;
+    read it with result.keys() and result.partitions() so only one batch is in memory.
+    """
+    with engine.connect().execution_options(stream_results=True, max_row_buffer=batch_rows) as conn:
+        query = text(f"""
+            SELECT *
+            FROM cached_full_contacts_data
+            WHERE {where_clause}
+            ORDER BY {order_by}
+        """)
+        yield conn.execute(query, params)
+
+def iter_filtered_batches(where_clause, params, order_by="companyname", batch_rows=EXPORT_BATCH_ROWS):
+    """Yields (columns, rows) batches of at most batch_rows rows."""
+    with open_filtered_cursor(where_clause, params, order_by, batch_rows) as result:
+        columns = list(result.keys())
+        for rows in result.partitions(batch_rows):
+            yield columns, rows
+
+def export_csv_gz(where_clause, params, order_by="companyname"):
+    """
+    Streams the filtered rows into a gzip-compressed CSV temp file.
+
+    Returns:
+    - (temp file path, row count); the caller deletes the file
+    """
+    row_count = 0
+    with _export_file(".csv.gz") as out_file, gzip.GzipFile(fileobj=out_file, mode="wb") as gz:
+        out = io.TextIOWrapper(gz, encoding="utf-8", newline="")
+        writer = csv.writer(out, lineterminator="\n")
+        with open_filtered_cursor(where_clause, params, order_by) as result:
+            writer.writerow(list(result.keys()))
+            for rows in result.partitions(EXPORT_BATCH_ROWS):
+                writer.writerows(rows)
+                row_count += len(rows)
+        out.flush()
+        out.detach()  # leave closing gz to the with-block
+    return out_file.name, row_count
+
+def _arrow_type(value):
+    """Arrow type for a column from its first non-null value; anything unrecognised is a string."""
+    if isinstance(value, bool):
+        return pa.bool_()
+    if isinstance(value, int):
+        return pa.int64()
+    if isinstance(value, (float, Decimal)):
+        return pa.float64()
+    if isinstance(value, datetime):
+        return pa.timestamp("us")
+    if isinstance(value, date):
+        return pa.date32()
+    return pa.string()
+
+def _arrow_values(values, arrow_type):
+    if pa.types.is_floating(arrow_type):
+        return [None if v is None else float(v) for v in values]
+    if pa.types.is_string(arrow_type):
+        return [None if v is None else str(v) for v in values]
+    return list(values)
+
+def _record_batch(columns, rows, schema):
+    arrays = [
+        pa.array(_arrow_values(values, field.type), type=field.type)
+        for values, field in zip(zip(*rows), schema)
+    ]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+def export_parquet(where_clause, params, order_by="companyname"):
+    """
+    Streams the filtered rows into a zstd-compressed Parquet temp file, one Arrow record batch
+    per cursor batch. The schema is fixed from the first batch (all-null columns as strings).
+
+    Returns:
+    - (temp file path, row count); the caller deletes the file
+    """
+    row_count = 0
+    writer = None
+    with _export_file(".parquet") as out_file:
+        with open_filtered_cursor(where_clause, params, order_by) as result:
+            columns = list(result.keys())
+            for rows in result.partitions(EXPORT_BATCH_ROWS):
+                if writer is None:
+                    first_values = [next((v for v in values if v is not None), None) for values in zip(*rows)]
+                    schema = pa.schema([(col, _arrow_type(v)) for col, v in zip(columns, first_values)])
+                    writer = pq.ParquetWriter(out_file, schema, compression="zstd")
+                writer.write_batch(_record_batch(columns, rows, schema))
+                row_count += len(rows)
+
+        if writer is None:  # no rows: still a valid file with the column names
+            schema = pa.schema([(col, pa.string()) for col in columns])
+            writer = pq.ParquetWriter(out_file, schema, compression="zstd")
+        writer.close()
+    return out_file.name, row_count
+
+def export_csv_zip(where_clause, params, part_rows=100_000, order_by="companyname"):
+    """
+    Streams the filtered rows into a ZIP of CSV parts of at most part_rows rows each
+    (filtered_data_part001.csv, ...), every part with its own header.
+
+    Returns:
+    - (temp file path, row count); the caller deletes the file
+    """
+    row_count = 0
+    with _export_file(".zip") as out_file, zipfile.ZipFile(out_file, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        part, part_file, writer, rows_in_part = 0, None, None, part_rows
+
+        def close_part():
+            if part_file is not None:
+                part_file.flush()
+                part_file.close()
+
+        with open_filtered_cursor(where_clause, params, order_by) as result:
+            columns = list(result.keys())
+            for rows in result.partitions(EXPORT_BATCH_ROWS):
+                while rows:
+                    if rows_in_part >= part_rows:
+                        close_part()
+                        part += 1
+                        part_file = io.TextIOWrapper(
+                            archive.open(f"filtered_data_part{part:03d}.csv", "w"), encoding="utf-8", newline=""
+                        )
+                        writer = csv.writer(part_file, lineterminator="\n")
+                        writer.writerow(columns)
+                        rows_in_part = 0
+                    take = rows[:part_rows - rows_in_part]
+                    writer.writerows(take)
+                    rows_in_part += len(take)
+                    row_count += len(take)
+                    rows = rows[len(take):]
+        close_part()
+        if part == 0:  # no rows: one header-only part
+            with io.TextIOWrapper(archive.open("filtered_data_part001.csv", "w"), encoding="utf-8", newline="") as empty:
+                csv.writer(empty, lineterminator="\n").writerow(columns)
+    return out_file.name, row_count
@@ -0,0 +1,161 @@
+# app_backend/filter_options.py
+
+### Per-column distinct filter values (filter_option_values) and the country -> state -> city hierarchy ###
+### (filter_location_hierarchy), rebuilt with the cache and kept up to date on upserts ###
+
+import pandas as pd
+from sqlalchemy import text
+
+FILTER_OPTION_COLUMNS = ["country", "compstate", "city", "companyname", "industry", "emailstatus", "jobtitle", "managementlevel"]
+LOCATION_COLUMNS = ["country", "compstate", "city"]
+# Too many values to list: searched server-side instead (search_filter_values)
+TYPEAHEAD_COLUMNS = ["companyname", "jobtitle"]
+LISTED_OPTION_COLUMNS = [col for col in FILTER_OPTION_COLUMNS if col not in TYPEAHEAD_COLUMNS]
+TYPEAHEAD_LIMIT = 50
+
+def rebuild_filter_option_values(conn, source="cached_full_contacts_data"):
+    """Replaces filter_option_values with the distinct values of every filter column (run inside the rebuild transaction)."""
+    conn.execute(text("TRUNCATE filter_option_values"))
+    selects = " UNION ALL ".join(
+        f"SELECT '{col}', {col} FROM {source} WHERE {col} IS NOT NULL GROUP BY {col}"
+        for col in FILTER_OPTION_COLUMNS
+    )
+    conn.execute(text(f"INSERT INTO filter_option_values (column_name, value) {selects}"))
+    rebuild_location_hierarchy(conn, source)
+
+def rebuild_location_hierarchy(conn, source="cached_full_contacts_data"):
+    """
+    Replaces filter_location_hierarchy with the distinct (country, compstate, city) triples.
+    The cache resolves them through fact_companies -> dim_countries/dim_states/dim_cities,
+    so only locations that actually have contacts are offered.
+    """
+    conn.execute(text("TRUNCATE filter_location_hierarchy"))
+    conn.execute(text(f"""
+        INSERT INTO filter_location_hierarchy (country, compstate, city)
+        SELECT country, compstate, city
+        FROM {source}
+        WHERE country IS NOT NULL OR compstate IS NOT NULL OR city IS NOT NULL
+        GROUP BY country, compstate, city
+    """))
+
+def add_filter_option_values(conn, df):
+    """
+    Adds the filter values of upserted cache rows. Values that disappear from the cache
+    are only dropped at the next full rebuild.
+    """
+    columns, values = [], []
+    for col in FILTER_OPTION_COLUMNS:
+        if col in df.columns:
+            distinct = df[col].dropna().astype(str).unique().tolist()
+            columns += [col] * len(distinct)
+            values += distinct
+    if values:
+        conn.execute(text("""
+            INSERT INTO filter_option_values (column_name, value)
+            SELECT * FROM UNNEST(CAST(:columns AS text[]), CAST(:values AS text[]))
+            ON CONFLICT (column_name, value) DO NOTHING
+        """), {"columns": columns, "values": values})
+
+    if set(LOCATION_COLUMNS).issubset(df.columns):
+        triples = df[LOCATION_COLUMNS].dropna(how="all").drop_duplicates()
+        if triples.empty:
+            return
+        params = {
+            col: [None if pd.isna(v) else str(v) for v in triples[col]]
+            for col in LOCATION_COLUMNS
+        }
+        conn.execute(text("""
+            INSERT INTO filter_location_hierarchy (country, compstate, city)
+            SELECT n.country, n.compstate, n.city
+            FROM UNNEST(CAST(:country AS text[]), CAST(:compstate AS text[]), CAST(:city AS text[]))
+                AS n(country, compstate, city)
+            WHERE NOT EXISTS (
+                SELECT 1 FROM filter_location_hierarchy h
+                WHERE h.country IS NOT DISTINCT FROM n.country
+                  AND h.compstate IS NOT DISTINCT FROM n.compstate
+                  AND h.city IS NOT DISTINCT FROM n.city
+            )
+        """), params)
+
+def load_filter_option_values(conn, columns=LISTED_OPTION_COLUMNS):
+    """{column: sorted values} for the given filter columns, from one indexed read."""
+    df = pd.read_sql(
+        text("SELECT column_name, value FROM filter_option_values WHERE column_name = ANY(:columns)"),
+        conn, params={"columns": list(columns)}
+    )
+    grouped = df.groupby("column_name")["value"]
+    return {
+        col: sorted(grouped.get_group(col).tolist()) if col in grouped.groups else []
+        for col in columns
+    }
+
+def _escape_like(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def search_filter_values(conn, column, query, limit=TYPEAHEAD_LIMIT):
+    """
+    Top matches for a typeahead search over one filter column: case-insensitive prefix
+    matches first (alphabetical), then substring/trigram matches by similarity.
+    """
+    query = query.strip()
+    if not query:
+        return []
+    rows = conn.execute(text("""
+        SELECT value
+        FROM (
+            (SELECT value, 0 AS rank, 1.0 AS score
+             FROM filter_option_values
+             WHERE column_name = :column AND lower(value) LIKE :prefix
+             ORDER BY lower(value)
+             LIMIT :limit)
+            UNION ALL
+            (SELECT value, 1 AS rank, similarity(value, :query) AS score
+             FROM filter_option_values
+             WHERE column_name = :column AND (value ILIKE :contains OR value % :query)
+             ORDER BY similarity(value, :query) DESC
+             LIMIT :limit)
+        ) matches
+        GROUP BY value
+        ORDER BY MIN(rank), MAX(score) DESC, value
+        LIMIT :limit
+    """), {
+        "column": column,
+        "query": query,
+        "prefix": _escape_like(query.lower()) + "%",
+        "contains": "%" + _escape_like(query) + "%",
+        "limit": limit,
+    }).fetchall()
+    return [row[0] for row in rows]
+
+def load_location_hierarchy(conn):
+    """All (country, compstate, city) triples as a DataFrame."""
+    return pd.read_sql(text("SELECT country, compstate, city FROM filter_location_hierarchy"), conn)
+
+def _with_selected(options, selected):
+    # Keep current selections selectable even when a parent filter no longer covers them
+    known = set(options)
+    extra = [value for value in selected if value not in known]
+    return options + extra
+
+def narrow_location_options(hierarchy, countries, states, cities, state_options, city_options):
+    """
+    Narrows the state and city option lists to the selected countries/states, in memory.
+
+    Parameters:
+    - hierarchy: DataFrame from load_location_hierarchy
+    - countries, states, cities: current selections (empty countries/states = no restriction)
+    - state_options, city_options: the unrestricted option lists
+
+    Returns:
+    - (state options, city options), each including the current selections
+    """
+    if not countries and not states:
+        return state_options, city_options
+    rows = hierarchy
+    if countries:
+        rows = rows[rows["country"].isin(countries)]
+    narrowed_states = sorted(rows["compstate"].dropna().unique().tolist()) if countries else state_options
+    if states:
+        rows = rows[rows["compstate"].isin(states)]
+    narrowed_cities = sorted(rows["city"].dropna().unique().tolist())
+    return _with_selected(narrowed_states, states), _with_selected(narrowed_cities, cities)
@@ -0,0 +1,300 @@
+# app_backend/migrations.py
+
+### Run with 'python -m app_backend.migrations' in terminal ###
+
+from sqlalchemy import text
+from app_backend.database import engine
+from app_backend.range_buckets import bucket_case_sql
+
+# Versioned schema changes. Each entry runs once and is recorded in schema_migrations.
+# Entries marked "reapply" are idempotent (IF NOT EXISTS) and are re-run after every cache
+# rebuild, because rebuilding cached_full_contacts_data with to_sql(if_exists="replace")
+# drops its indexes.
+MIGRATIONS = [
+    {
+        "version": 1,
+        "description": "pg_trgm extension for substring search",
+        "reapply": False,
+        "statements": [
+            "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        ],
+    },
+    {
+        "version": 2,
+        "description": "btree indexes on cached_full_contacts_data filter columns",
+        "reapply": True,
+        "statements": [
+            # to_sql(if_exists="replace") drops the primary key; update_cached_contacts needs a
+            # unique index on id for ON CONFLICT (id). Replaces the earlier non-unique idx_cfcd_id.
+            "DROP INDEX IF EXISTS idx_cfcd_id",
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_cfcd_id_unique ON cached_full_contacts_data (id)",
+            "CREATE INDEX IF NOT EXISTS idx_cfcd_country ON cached_full_contacts_data (country)",
+            "CREATE INDEX IF NOT EXISTS idx_cfcd_compstate ON cached_full_contacts_data (compstate)",
+            "CREATE INDEX IF NOT EXISTS idx_cfcd_city ON cached_full_contacts_data (city)",
+            "CREATE INDEX IF NOT EXISTS idx_cfcd_industry ON cached_full_contacts_data (industry)",
+            "CREATE INDEX IF NOT EXISTS idx_cfcd_emailstatus ON cached_full_contacts_data (emailstatus)",
+            "CREATE INDEX IF NOT EXISTS idx_cfcd_managementlevel ON cached_full_contacts_data (managementlevel)",
+            "CREATE INDEX IF NOT EXISTS idx_cfcd_companyname ON cached_full_contacts_data (companyname)",
+        ],
+    },
+    {
+        "version": 3,
+        "description": "Partial range indexes and covering indexes for the count path",
+        "reapply": True,
+        "statements": [
+            # Range filters never match NULL, so leave NULLs out of the index
+            "CREATE INDEX IF NOT EXISTS idx_cfcd_empsize ON cached_full_contacts_data (empsize) WHERE empsize IS NOT NULL",
+            "CREATE INDEX IF NOT EXISTS idx_cfcd_annrev ON cached_full_contacts_data (annrev) WHERE annrev IS NOT NULL",
+            # Index-only scans for COUNT(*) and keyset paging on location drill-downs
+            "CREATE INDEX IF NOT EXISTS idx_cfcd_location_cover ON cached_full_contacts_data (country, compstate, city) INCLUDE (id)",
+            "CREATE INDEX IF NOT EXISTS idx_cfcd_contact_cover ON cached_full_contacts_data (managementlevel, emailstatus) INCLUDE (id)",
+        ],
+    },
+    {
+        "version": 4,
+        "description": "Trigram GIN index for jobtitle ILIKE '%kw%'",
+        "reapply": True,
+        "statements": [
+            "CREATE INDEX IF NOT EXISTS idx_cfcd_jobtitle_trgm ON cached_full_contacts_data USING gin (jobtitle gin_trgm_ops)",
+        ],
+    },
+    {
+        "version": 5,
+        "description": "btree index on jobtitle for keyword searches resolved to exact titles",
+        "reapply": True,
+        "statements": [
+            "CREATE INDEX IF NOT EXISTS idx_cfcd_jobtitle ON cached_full_contacts_data (jobtitle)",
+        ],
+    },
+    {
+        "version": 6,
+        "description": "cache_data_version counter bumped on every cache refresh",
+        "reapply": False,
+        "statements": [
+            """
+            CREATE TABLE IF NOT EXISTS cache_data_version (
+                id SMALLINT PRIMARY KEY CHECK (id = 1),
+                version BIGINT NOT NULL DEFAULT 0,
+                refreshed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            )
+            """,
+            "INSERT INTO cache_data_version (id, version) VALUES (1, 0) ON CONFLICT (id) DO NOTHING",
+        ],
+    },
+    {
+        "version": 7,
+        "description": "Unlogged uploaded_filter_lists table for suppression/TAL joins",
+        "reapply": False,
+        "statements": [
+            """
+            CREATE UNLOGGED TABLE IF NOT EXISTS uploaded_filter_lists (
+                list_id TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                PRIMARY KEY (list_id, value)
+            )
+            """,
+        ],
+    },
+    {
+        "version": 8,
+        "description": "filter_option_values: distinct values per filter column",
+        "reapply": False,
+        "statements": [
+            """
+            CREATE TABLE IF NOT EXISTS filter_option_values (
+                column_name TEXT NOT NULL,
+                value TEXT NOT NULL,
+                PRIMARY KEY (column_name, value)
+            )
+            """,
+        ],
+    },
+    {
+        "version": 9,
+        "description": "filter_location_hierarchy: country -> state -> city triples for cascading filters",
+        "reapply": False,
+        "statements": [
+            """
+            CREATE TABLE IF NOT EXISTS filter_location_hierarchy (
+                country TEXT,
+                compstate TEXT,
+                city TEXT
+            )
+            """,
+        ],
+    },
+    {
+        "version": 10,
+        "description": "Typeahead indexes on filter_option_values (case-insensitive prefix + trigram)",
+        "reapply": False,
+        "statements": [
+            """
+            CREATE INDEX IF NOT EXISTS idx_fov_value_prefix
+            ON filter_option_values (column_name, lower(value) text_pattern_ops)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_fov_value_trgm
+            ON filter_option_values USING gin (value gin_trgm_ops)
+            WHERE column_name IN ('companyname', 'jobtitle')
+            """,
+        ],
+    },
+    {
+        "version": 11,
+        "description": "saved_query_snapshots: materialized contact ids per saved query",
+        "reapply": False,
+        "statements": [
+            """
+            CREATE TABLE IF NOT EXISTS saved_query_snapshots (
+                query_id INTEGER PRIMARY KEY,
+                contact_ids BIGINT[] NOT NULL,
+                row_count INTEGER NOT NULL,
+                data_version BIGINT NOT NULL,
+                revision INTEGER NOT NULL DEFAULT 1,
+                watermark TIMESTAMP,
+                created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                refreshed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            )
+            """,
+        ],
+    },
+    {
+        "version": 12,
+        "description": "last_updated index for incremental snapshot refreshes",
+        "reapply": True,
+        "statements": [
+            "CREATE INDEX IF NOT EXISTS idx_cfcd_last_updated ON cached_full_contacts_data (last_updated)",
+        ],
+    },
+    {
+        "version": 13,
+        "description": "explorer_query_log: Explorer query timings and EXPLAIN ANALYZE of slow calls",
+        "reapply": False,
+        "statements": [
+            """
+            CREATE TABLE IF NOT EXISTS explorer_query_log (
+                id BIGSERIAL PRIMARY KEY,
+                logged_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                function_name TEXT NOT NULL,
+                signature TEXT NOT NULL,
+                arguments JSONB,
+                duration_ms DOUBLE PRECISION NOT NULL,
+                row_count BIGINT,
+                slow BOOLEAN NOT NULL DEFAULT FALSE,
+                statement TEXT,
+                explain TEXT
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_eql_logged_at ON explorer_query_log (logged_at)",
+            "CREATE INDEX IF NOT EXISTS idx_eql_function_signature ON explorer_query_log (function_name, signature)",
+        ],
+    },
+    {
+        "version": 14,
+        "description": "empsize_range/annrev_range bucket codes on cached_full_contacts_data",
+        "reapply": False,
+        "statements": [
+            "ALTER TABLE cached_full_contacts_data ADD COLUMN IF NOT EXISTS empsize_range SMALLINT",
+            "ALTER TABLE cached_full_contacts_data ADD COLUMN IF NOT EXISTS annrev_range SMALLINT",
+            f"""
+            UPDATE cached_full_contacts_data
+            SET empsize_range = {bucket_case_sql("empsize")},
+                annrev_range = {bucket_case_sql("annrev")}
+            """,
+        ],
+    },
+    {
+        "version": 15,
+        "description": "Indexes on the range bucket codes",
+        "reapply": True,
+        "statements": [
+            "CREATE INDEX IF NOT EXISTS idx_cfcd_empsize_range ON cached_full_contacts_data (empsize_range) WHERE empsize_range IS NOT NULL",
+            "CREATE INDEX IF NOT EXISTS idx_cfcd_annrev_range ON cached_full_contacts_data (annrev_range) WHERE annrev_range IS NOT NULL",
+        ],
+    },
+    {
+        "version": 16,
+        "description": "lower() expression indexes for the company lookups in get_existing_company_ids",
+        "reapply": False,
+        # fact_companies takes writes during imports; build without blocking them
+        "concurrently": True,
+        "statements": [
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_fact_companies_lower_domain ON fact_companies (LOWER(comp_domain))",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_fact_companies_lower_name ON fact_companies (LOWER(name))",
+        ],
+    },
+]
+
+def apply_migrations(log, engine=engine, reapply=False):
+    """
+    Applies pending migrations in version order and records them in schema_migrations.
+    With reapply=True, idempotent index migrations already applied are run again.
+    Migrations marked "concurrently" run outside a transaction (CREATE INDEX CONCURRENTLY).
+    """
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                description TEXT,
+                applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            )
+        """))
+        applied = {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+    for migration in sorted(MIGRATIONS, key=lambda m: m["version"]):
+        is_new = migration["version"] not in applied
+        if not is_new and not (reapply and migration["reapply"]):
+            continue
+
+        if migration.get("concurrently"):
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                for statement in migration["statements"]:
+                    conn.execute(text(statement))
+
+        with engine.begin() as conn:
+            if not migration.get("concurrently"):
+                for statement in migration["statements"]:
+                    conn.execute(text(statement))
+            if is_new:
+                conn.execute(
+                    text("INSERT INTO schema_migrations (version, description) VALUES (:version, :description)"),
+                    {"version": migration["version"], "description": migration["description"]}
+                )
+        log(f"🧱 Migration {migration['version']} {'applied' if is_new else 're-applied'}: {migration['description']}")
+
+def report_index_sizes(log, engine=engine, table="cached_full_contacts_data"):
+    """Logs the size of the table and each of its indexes; returns [(index_name, pretty_size)]."""
+    with engine.connect() as conn:
+        table_size = conn.execute(
+            text("SELECT pg_size_pretty(pg_relation_size(CAST(:table AS regclass)))"), {"table": table}
+        ).scalar()
+        rows = conn.execute(text("""
+            SELECT indexrelname, pg_size_pretty(pg_relation_size(indexrelid))
+            FROM pg_stat_user_indexes
+            WHERE relname = :table
+            ORDER BY pg_relation_size(indexrelid) DESC
+        """), {"table": table}).fetchall()
+
+    log(f"📐 {table}: {table_size} (heap)")
+    for index_name, size in rows:
+        log(f"📐   {index_name}: {size}")
+    return [(index_name, size) for index_name, size in rows]
+
+def maintain_cache_indexes(log, engine=engine):
+    """
+    Run after every cache rebuild: (re)creates the filter indexes, refreshes planner
+    statistics and the visibility map (so counts can use index-only scans) and reports sizes.
+    """
+    apply_migrations(log, engine, reapply=True)
+
+    # VACUUM can't run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM (ANALYZE) cached_full_contacts_data"))
+        conn.execute(text("ANALYZE cached_filters_contacts_data"))
+    log("📊 cached_full_contacts_data vacuumed and analyzed.")
+
+    return report_index_sizes(log, engine)
+
+if __name__ == "__main__":
+    maintain_cache_indexes(print)
@@ -0,0 +1,157 @@
+# app_backend/query_log.py
+
+### Slow query log for the Explorer query functions: duration, rows, filter signature and EXPLAIN ANALYZE ###
+
+import os
+import json
+import time
+import functools
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from sqlalchemy import event, text
+from app_backend.database import engine
+from app_backend.result_cache import call_signature
+
+SLOW_QUERY_MS = float(os.getenv("EXPLORER_SLOW_QUERY_MS", "1000"))
+EXPLAIN_TIMEOUT_MS = 60_000  # EXPLAIN ANALYZE re-runs the query; don't let it run away
+QUERY_LOG_RETENTION = "30 days"
+# A plan is captured at most once per function + filter signature in this window
+EXPLAIN_COOLDOWN_SECONDS = int(os.getenv("EXPLORER_EXPLAIN_COOLDOWN", "3600"))
+MAX_TRACKED_EXPLAINS = 1024
+
+# The instrumented call running in this thread/context: statements executed inside it are collected here
+_current_call = contextvars.ContextVar("explorer_query_call", default=None)
+# Log writes and EXPLAIN captures run off the request path, one at a time
+_log_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="query-log")
+_last_explained = {}  # (function_name, signature) -> monotonic time; only touched by the log worker
+
+# Statements outside an instrumented call return straight away. The start time lives on the
+# per-statement execution context, so a failed statement leaves nothing behind.
+@event.listens_for(engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_call.get() is not None and context is not None:
+        context._query_log_start = time.perf_counter()
+
+@event.listens_for(engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    call = _current_call.get()
+    start = getattr(context, "_query_log_start", None)
+    if call is None or start is None:
+        return
+    call["statements"].append(((time.perf_counter() - start) * 1000, statement, parameters))
+
+def _result_rows(value):
+    """Matched/returned rows for the log: counts as-is, frames and lists by length."""
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, (pd.DataFrame, pd.Series, list)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(len(v) for v in value.values() if hasattr(v, "__len__"))
+    return None
+
+def _explain(statement, parameters):
+    # Only plain reads are re-run; EXPLAIN of an EXPLAIN (get_estimated_count) is meaningless
+    if not statement.lstrip().upper().startswith(("SELECT", "WITH")):
+        return None
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(EXPLAIN_TIMEOUT_MS)}")
+        rows = conn.exec_driver_sql("EXPLAIN (ANALYZE, BUFFERS) " + statement, parameters).fetchall()
+    return "\n".join(row[0] for row in rows)
+
+def _explain_due(entry):
+    """True when no plan was captured for this function + signature within EXPLAIN_COOLDOWN_SECONDS."""
+    now = time.monotonic()
+    key = (entry["function_name"], entry["signature"])
+    last = _last_explained.get(key)
+    if last is not None and now - last < EXPLAIN_COOLDOWN_SECONDS:
+        return False
+    _last_explained.pop(key, None)
+    _last_explained[key] = now
+    while len(_last_explained) > MAX_TRACKED_EXPLAINS:
+        _last_explained.pop(next(iter(_last_explained)))
+    return True
+
+def _write_entry(entry, statement, parameters):
+    try:
+        explain = None
+        if entry["slow"] and statement is not None and _explain_due(entry):
+            try:
+                explain = _explain(statement, parameters)
+            except Exception as e:
+                explain = f"EXPLAIN failed: {e}"
+        with engine.begin() as conn:
+            conn.execute(text("""
+                INSERT INTO explorer_query_log
+                    (function_name, signature, arguments, duration_ms, row_count, slow, statement, explain)
+                VALUES
+                    (:function_name, :signature, CAST(:arguments AS jsonb), :duration_ms, :row_count, :slow, :statement, :explain)
+            """), {**entry, "statement": statement if entry["slow"] else None, "explain": explain})
+    except Exception as e:
+        print(f"⚠️ Could not write query log entry: {e}")
+
+def instrumented(fn):
+    """
+    Logs every call of fn to explorer_query_log (duration, result rows, argument signature).
+    Calls over SLOW_QUERY_MS also get EXPLAIN (ANALYZE, BUFFERS) of their slowest statement,
+    captured in the background (once per signature per EXPLAIN_COOLDOWN_SECONDS). Put it under @cached_result so only cache misses are logged.
+    """
+    name = f"{fn.__module__}.{fn.__qualname__}"
+    signature = call_signature(fn)
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        call = {"statements": []}
+        token = _current_call.set(call)
+        start = time.perf_counter()
+        try:
+            value = fn(*args, **kwargs)
+        finally:
+            _current_call.reset(token)
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        slowest = max(call["statements"], key=lambda s: s[0], default=(None, None, None))
+        entry = {
+            "function_name": name,
+            "signature": signature(args, kwargs),
+            "arguments": json.dumps([args, kwargs], default=str),
+            "duration_ms": round(duration_ms, 2),
+            "row_count": _result_rows(value),
+            "slow": duration_ms >= SLOW_QUERY_MS,
+        }
+        parameters = dict(slowest[2]) if isinstance(slowest[2], dict) else slowest[2]
+        _log_executor.submit(_write_entry, entry, slowest[1], parameters)
+        return value
+
+    return wrapper
+
+def purge_query_log(db_engine=engine):
+    """Deletes log entries older than QUERY_LOG_RETENTION; returns the number removed."""
+    with db_engine.begin() as conn:
+        result = conn.execute(text(f"DELETE FROM explorer_query_log WHERE logged_at < NOW() - INTERVAL '{QUERY_LOG_RETENTION}'"))
+        return result.rowcount
+
+def top_offenders(limit=50, db_engine=engine):
+    """Function/filter-signature pairs ordered by their slowest call, with the slowest call's plan."""
+    query = text("""
+        SELECT
+            function_name,
+            signature,
+            COUNT(*) AS calls,
+            SUM(CASE WHEN slow THEN 1 ELSE 0 END) AS slow_calls,
+            ROUND(CAST(AVG(duration_ms) AS numeric), 1) AS avg_ms,
+            ROUND(CAST(MAX(duration_ms) AS numeric), 1) AS max_ms,
+            MAX(row_count) AS max_rows,
+            MAX(logged_at) AS last_seen,
+            (array_agg(CAST(arguments AS text) ORDER BY duration_ms DESC))[1] AS slowest_arguments,
+            (array_agg(explain ORDER BY duration_ms DESC) FILTER (WHERE explain IS NOT NULL))[1] AS slowest_explain
+        FROM explorer_query_log
+        GROUP BY function_name, signature
+        ORDER BY MAX(duration_ms) DESC
+        LIMIT :limit
+    """)
+    with db_engine.connect() as conn:
+        return pd.read_sql(query, conn, params={"limit": limit})
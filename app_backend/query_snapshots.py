@@ -0,0 +1,99 @@
+# app_backend/query_snapshots.py
+
+### Materialized saved-query results: the matching contact ids stored per dim_savedqueries row ###
+
+from sqlalchemy import text
+from app_backend.database import engine
+from app_backend.data_version import get_data_version
+
+def get_query_snapshot(query_id, db_engine=engine):
+    """Snapshot metadata for a saved query (without the id array), or None."""
+    with db_engine.connect() as conn:
+        row = conn.execute(text("""
+            SELECT query_id, row_count, data_version, revision, watermark, created_at, refreshed_at
+            FROM saved_query_snapshots
+            WHERE query_id = :query_id
+        """), {"query_id": query_id}).mappings().fetchone()
+    return dict(row) if row else None
+
+def materialize_query_snapshot(query_id, where_clause, params, db_engine=engine):
+    """
+    Stores the ids of all cache rows matching the saved query's filters (full recompute).
+    The watermark is the newest last_updated seen, so a later refresh only re-checks newer rows.
+    """
+    with db_engine.begin() as conn:
+        conn.execute(text(f"""
+            INSERT INTO saved_query_snapshots
+                (query_id, contact_ids, row_count, data_version, revision, watermark, created_at, refreshed_at)
+            SELECT
+                :snapshot_query_id,
+                COALESCE(array_agg(id ORDER BY id), CAST('{{}}' AS bigint[])),
+                COUNT(*),
+                :snapshot_data_version,
+                1,
+                (SELECT MAX(last_updated) FROM cached_full_contacts_data),
+                NOW(),
+                NOW()
+            FROM cached_full_contacts_data
+            WHERE {where_clause}
+            ON CONFLICT (query_id) DO UPDATE SET
+                contact_ids = EXCLUDED.contact_ids,
+                row_count = EXCLUDED.row_count,
+                data_version = EXCLUDED.data_version,
+                revision = saved_query_snapshots.revision + 1,
+                watermark = EXCLUDED.watermark,
+                refreshed_at = NOW()
+        """), {**params, "snapshot_query_id": query_id, "snapshot_data_version": get_data_version()})
+    return get_query_snapshot(query_id, db_engine)
+
+def refresh_query_snapshot(query_id, where_clause, params, db_engine=engine):
+    """
+    Incremental refresh: ids whose cache row is unchanged since the watermark are kept
+    (deleted rows drop out through the join), rows updated after it are re-evaluated
+    against the filters. A full cache rebuild touches every row, which makes this a full
+    recompute. Materializes the snapshot when it does not exist yet.
+    """
+    if get_query_snapshot(query_id, db_engine) is None:
+        return materialize_query_snapshot(query_id, where_clause, params, db_engine)
+
+    with db_engine.begin() as conn:
+        conn.execute(text(f"""
+            UPDATE saved_query_snapshots s
+            SET contact_ids = m.ids,
+                row_count = m.n,
+                data_version = :snapshot_data_version,
+                revision = s.revision + 1,
+                watermark = w.watermark,
+                refreshed_at = NOW()
+            FROM (
+                SELECT COALESCE(array_agg(id ORDER BY id), CAST('{{}}' AS bigint[])) AS ids, COUNT(*) AS n
+                FROM (
+                    SELECT c.id
+                    FROM saved_query_snapshots old
+                        CROSS JOIN UNNEST(old.contact_ids) AS k(id)
+                        JOIN cached_full_contacts_data c ON c.id = k.id
+                    WHERE old.query_id = :snapshot_query_id
+                      AND c.last_updated <= old.watermark
+                    UNION
+                    SELECT id
+                    FROM cached_full_contacts_data
+                    WHERE last_updated > (SELECT watermark FROM saved_query_snapshots WHERE query_id = :snapshot_query_id)
+                      AND {where_clause}
+                ) matched
+            ) m,
+            (SELECT MAX(last_updated) AS watermark FROM cached_full_contacts_data) w
+            WHERE s.query_id = :snapshot_query_id
+        """), {**params, "snapshot_query_id": query_id, "snapshot_data_version": get_data_version()})
+    return get_query_snapshot(query_id, db_engine)
+
+def snapshot_filter(query_id, revision):
+    """
+    (where_clause, params) selecting the snapshot's rows by primary key, usable wherever
+    build_filter_conditions output is (paging, counts, facets, exports). The revision is
+    part of the clause text so cached results keyed on it stop matching after a refresh.
+    """
+    where_clause = (
+        "id IN (SELECT UNNEST(contact_ids) FROM saved_query_snapshots WHERE query_id = :snapshot_query_id)"
+        f" /* snapshot revision {int(revision)} */"
+    )
+    return where_clause, {"snapshot_query_id": query_id}
@@ -0,0 +1,55 @@
+# app_backend/range_buckets.py
+
+### empsize/annrev bucket codes (empsize_range/annrev_range smallint columns) from the shared filter_config buckets ###
+
+import pandas as pd
+from sqlalchemy import text
+from filter_config import EMPSIZE_BUCKET_EDGES, EMPSIZE_BUCKET_LABELS, ANNREV_BUCKET_EDGES, ANNREV_BUCKET_LABELS
+
+# value column -> (edges, labels); the code column is f"{column}_range"
+RANGE_BUCKETS = {
+    "empsize": (EMPSIZE_BUCKET_EDGES, EMPSIZE_BUCKET_LABELS),
+    "annrev": (ANNREV_BUCKET_EDGES, ANNREV_BUCKET_LABELS),
+}
+
+def _sql_number(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+def bucket_case_sql(column, expression=None):
+    """CASE expression computing the bucket code of column (NULL stays NULL)."""
+    expression = expression or column
+    edges, _ = RANGE_BUCKETS[column]
+    whens = " ".join(
+        f"WHEN {expression} <= {_sql_number(high)} THEN {code}"
+        for code, high in enumerate(edges[1:-1])
+    )
+    return f"CASE WHEN {expression} IS NULL THEN NULL {whens} ELSE {len(edges) - 2} END"
+
+def bucket_codes(column, labels):
+    """Codes for the selected labels (unknown labels are dropped)."""
+    _, bucket_labels = RANGE_BUCKETS[column]
+    return [bucket_labels.index(label) for label in labels if label in bucket_labels]
+
+def add_range_buckets(df):
+    """Adds empsize_range/annrev_range codes to a frame with raw empsize/annrev columns."""
+    for column, (edges, _) in RANGE_BUCKETS.items():
+        if column in df.columns:
+            values = pd.to_numeric(df[column], errors="coerce")
+            df[f"{column}_range"] = pd.cut(values, bins=edges, labels=False, right=True).astype("Int16")
+    return df
+
+def bucket_labels(column, codes):
+    """Display labels for a Series of stored codes."""
+    _, labels = RANGE_BUCKETS[column]
+    codes = pd.to_numeric(codes, errors="coerce").fillna(-1).astype(int)
+    return pd.Categorical.from_codes(codes, categories=labels)
+
+def update_range_buckets(conn, ids=None):
+    """Recomputes the stored codes in cached_full_contacts_data, for all rows or the given ids."""
+    where = "WHERE id = ANY(:ids)" if ids is not None else ""
+    conn.execute(text(f"""
+        UPDATE cached_full_contacts_data
+        SET empsize_range = {bucket_case_sql("empsize")},
+            annrev_range = {bucket_case_sql("annrev")}
+        {where}
+    """), {"ids": list(ids)} if ids is not None else {})
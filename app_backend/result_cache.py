@@ -0,0 +1,229 @@
+# app_backend/result_cache.py
+
+### Process-wide query result cache shared by all sessions, keyed by filter signature + data version ###
+
+import os
+import re
+import json
+import time
+import pickle
+import hashlib
+import inspect
+import threading
+import functools
+from contextlib import contextmanager
+from collections import OrderedDict
+import pandas as pd
+from app_backend.data_version import get_data_version
+
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_MB", "256")) * 1024 * 1024
+RESULT_CACHE_MAX_AGE = 86400  # seconds, same as the old st.cache_data ttl
+# Optional disk spill for evicted entries (disabled unless a directory is configured)
+RESULT_CACHE_SPILL_DIR = os.getenv("RESULT_CACHE_SPILL_DIR")
+RESULT_CACHE_SPILL_MAX_BYTES = int(os.getenv("RESULT_CACHE_SPILL_MAX_MB", "1024")) * 1024 * 1024
+
+def _canonical(value):
+    # Dict order doesn't matter; everything else (types, whitespace, list vs tuple) does
+    if isinstance(value, dict):
+        return ("dict", [(_canonical(k), _canonical(v)) for k, v in sorted(value.items(), key=lambda kv: repr(kv[0]))])
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__, [_canonical(v) for v in value])
+    if isinstance(value, (set, frozenset)):
+        return (type(value).__name__, sorted(_canonical(v) for v in value))
+    return (type(value).__name__, value if isinstance(value, (str, int, float, bool, type(None))) else str(value))
+
+def make_signature(where_clause, *parts):
+    """
+    Stable hash of (where_clause, params, ...). Only the where-clause text has its whitespace
+    collapsed (it is SQL built by build_filter_conditions); params and the other parts are
+    hashed exactly, so 'Acme  Inc' and 'Acme Inc' stay different filters.
+    """
+    if isinstance(where_clause, str):
+        where_clause = re.sub(r"\s+", " ", where_clause).strip()
+    payload = json.dumps(_canonical([where_clause, *parts]))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+def call_signature(fn):
+    """
+    Returns signature(args, kwargs) for calls of fn: a leading where_clause argument is
+    normalized like make_signature, all other arguments are hashed exactly.
+    """
+    takes_where = next(iter(inspect.signature(fn).parameters), None) == "where_clause"
+
+    def signature(args, kwargs):
+        if takes_where and args:
+            return make_signature(args[0], args[1:], kwargs)
+        return make_signature(None, args, kwargs)
+
+    return signature
+
+def _sizeof(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 1024
+
+def _copy_out(value):
+    # Callers add display columns to returned frames; never hand out the cached object
+    if isinstance(value, pd.DataFrame):
+        return value.copy()
+    if isinstance(value, (list, dict)):
+        return value.copy()
+    return value
+
+class ResultCache:
+    """
+    LRU cache with a memory ceiling (bytes), entry max age, hit/miss statistics and an
+    optional disk spill: entries evicted from memory are pickled to spill_dir and
+    promoted back on the next hit.
+    """
+
+    def __init__(self, max_bytes=RESULT_CACHE_MAX_BYTES, max_age=RESULT_CACHE_MAX_AGE,
+                 spill_dir=RESULT_CACHE_SPILL_DIR, spill_max_bytes=RESULT_CACHE_SPILL_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.spill_dir = spill_dir
+        self.spill_max_bytes = spill_max_bytes
+        self._entries = OrderedDict()  # key -> (value, size, stored_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._key_locks = {}  # key -> [lock, holders], only while someone is looking the key up
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "spills": 0, "expired": 0}
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def _spill_path(self, key):
+        return os.path.join(self.spill_dir, hashlib.sha1(repr(key).encode("utf-8")).hexdigest() + ".pkl")
+
+    def _spill(self, key, value, stored_at):
+        path = self._spill_path(key)
+        try:
+            with open(path, "wb") as f:
+                pickle.dump((stored_at, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+            self._stats["spills"] += 1
+            self._trim_spill()
+        except OSError:
+            pass
+
+    def _trim_spill(self):
+        files = [os.path.join(self.spill_dir, name) for name in os.listdir(self.spill_dir) if name.endswith(".pkl")]
+        files.sort(key=os.path.getmtime)
+        total = sum(os.path.getsize(path) for path in files)
+        while files and total > self.spill_max_bytes:
+            path = files.pop(0)
+            total -= os.path.getsize(path)
+            os.remove(path)
+
+    def _load_spilled(self, key):
+        path = self._spill_path(key)
+        try:
+            with open(path, "rb") as f:
+                stored_at, value = pickle.load(f)
+            os.remove(path)
+        except (OSError, pickle.PickleError, EOFError):
+            return None
+        if time.time() - stored_at > self.max_age:
+            self._stats["expired"] += 1
+            return None
+        return value, stored_at
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            key, (value, size, stored_at) = self._entries.popitem(last=False)
+            self._bytes -= size
+            self._stats["evictions"] += 1
+            if self.spill_dir:
+                self._spill(key, value, stored_at)
+
+    def get(self, key):
+        """Returns (True, value) on a hit, (False, None) on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, size, stored_at = entry
+                if time.time() - stored_at <= self.max_age:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return True, _copy_out(value)
+                del self._entries[key]
+                self._bytes -= size
+                self._stats["expired"] += 1
+
+            if self.spill_dir:
+                spilled = self._load_spilled(key)
+                if spilled is not None:
+                    value, stored_at = spilled
+                    self._store(key, value, stored_at)
+                    self._stats["disk_hits"] += 1
+                    return True, _copy_out(value)
+
+            self._stats["misses"] += 1
+            return False, None
+
+    @contextmanager
+    def locked(self, key):
+        """
+        Serializes lookup + compute + put for one key, so concurrent misses on the same key
+        compute once and the others get the stored value. Other keys are not blocked.
+        """
+        with self._lock:
+            entry = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._key_locks[key]
+
+    def _store(self, key, value, stored_at):
+        size = _sizeof(value)
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key)[1]
+        self._entries[key] = (value, size, stored_at)
+        self._bytes += size
+        self._evict()
+
+    def put(self, key, value):
+        with self._lock:
+            self._store(key, value, time.time())
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["disk_hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hit_rate": round((self._stats["hits"] + self._stats["disk_hits"]) / lookups, 3) if lookups else None,
+            }
+
+result_cache = ResultCache()
+
+def cached_result(fn):
+    """
+    Caches fn(*args, **kwargs) in result_cache under (function, normalized argument
+    signature, cache data version). A refresh bumps the data version, so older entries
+    simply stop matching and age out of the LRU; nothing is flushed globally.
+    """
+    name = f"{fn.__module__}.{fn.__qualname__}"
+    signature = call_signature(fn)
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = (name, signature(args, kwargs), get_data_version())
+        with result_cache.locked(key):
+            hit, value = result_cache.get(key)
+            if hit:
+                return value
+            value = fn(*args, **kwargs)
+            result_cache.put(key, value)
+        return _copy_out(value)
+
+    wrapper.cache_key = lambda *args, **kwargs: (name, signature(args, kwargs), get_data_version())
+    return wrapper
@@ -0,0 +1,216 @@
+# app_backend/snapshot.py
+
+### Optional in-process columnar copy of the filter columns of cached_full_contacts_data for the Data Explorer ###
+### Enable with EXPLORER_SNAPSHOT=1; reloaded in the background whenever the cache data version changes. ###
+
+import os
+import re
+import time
+import threading
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+from sqlalchemy import text
+from app_backend.database import engine
+from app_backend.data_version import get_data_version
+from app_backend.range_buckets import bucket_codes
+from app_backend.bitmap_index import BITMAP_COLUMNS, BITMAP_RANGES, load_or_build_bitmap_index
+
+SNAPSHOT_LOAD_CHUNK_ROWS = 200_000
+SNAPSHOT_RETRY_SECONDS = 60  # wait after a failed background load before trying again
+
+# Only what the filters need is held in memory; displayed rows are fetched from Postgres by id.
+# Dictionary-encoded columns (filters compare integer codes instead of strings)
+CATEGORICAL_COLUMNS = ["country", "compstate", "city", "industry", "emailstatus", "managementlevel", "companyname", "jobtitle"]
+# Stored bucket codes of the range filters (empsize_range, annrev_range; NULL as -1)
+RANGE_COLUMNS = ["empsize", "annrev"]
+SNAPSHOT_COLUMNS = ["id"] + CATEGORICAL_COLUMNS + [f"{col}_range" for col in RANGE_COLUMNS]
+
+# build_filter_conditions keys answered with an IN on a categorical column
+IN_FILTERS = ["country", "compstate", "city", "industry", "emailstatus", "companyname", "jobtitle", "managementlevel"]
+
+def snapshot_enabled():
+    return os.getenv("EXPLORER_SNAPSHOT", "").strip().lower() in ("1", "true", "yes")
+
+def _encode_chunk(chunk):
+    for col in CATEGORICAL_COLUMNS:
+        if col in chunk.columns:
+            chunk[col] = chunk[col].astype("category")
+    for col in RANGE_COLUMNS:
+        code_col = f"{col}_range"
+        if code_col in chunk.columns:
+            chunk[code_col] = pd.to_numeric(chunk[code_col], errors="coerce").fillna(-1).astype("int8")
+    return chunk
+
+def _concat_encoded(chunks):
+    """Concatenates encoded chunks, unifying each categorical column's dictionary."""
+    if not chunks:
+        return pd.DataFrame()
+    unified = {}
+    for col in CATEGORICAL_COLUMNS:
+        if col in chunks[0].columns:
+            unified[col] = union_categoricals([chunk[col] for chunk in chunks])
+    df = pd.concat([chunk.drop(columns=list(unified)) for chunk in chunks], ignore_index=True)
+    for col, values in unified.items():
+        df[col] = values
+    return df[chunks[0].columns]
+
+class ContactsSnapshot:
+    """
+    Columnar, id-ordered copy of the contacts cache filter columns. Answers the same filters
+    as logic.build_filter_conditions (without suppression/TAL files) with vectorized masks.
+    """
+
+    def __init__(self, df, version, page_size):
+        self.df = df.sort_values("id", kind="stable").reset_index(drop=True)
+        self.ids = self.df["id"].to_numpy(dtype=np.int64)
+        self.version = version
+        self.page_size = page_size
+        self._codes = {col: self.df[col].cat.codes.to_numpy() for col in CATEGORICAL_COLUMNS if col in self.df.columns}
+        self._ranges = {col: self.df[f"{col}_range"].to_numpy() for col in RANGE_COLUMNS if f"{col}_range" in self.df.columns}
+        self.bitmaps = None  # BitmapIndex, attached by get_snapshot
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _in_mask(self, column, values):
+        codes = self.df[column].cat.categories.get_indexer(values)
+        return np.isin(self._codes[column], codes[codes >= 0])
+
+    def _range_mask(self, column, labels):
+        return np.isin(self._ranges[column], bucket_codes(column, labels))
+
+    def mask(self, filters, skip=()):
+        """Boolean row mask for the filters; keys in skip are left to the caller (bitmap-indexed)."""
+        mask = np.ones(len(self.ids), dtype=bool)
+        for key in IN_FILTERS:
+            values = filters.get(key, [])
+            if key not in skip and values and values != ["All"]:
+                mask &= self._in_mask(key, values)
+
+        if filters.get("jobtitle_text"):
+            keywords = [kw.strip() for kw in filters["jobtitle_text"].split(",") if kw.strip()]
+            if keywords:
+                # ILIKE '%kw%' over the (few) distinct titles, then a code lookup
+                pattern = re.compile("|".join(re.escape(kw) for kw in keywords), re.IGNORECASE)
+                titles = pd.Series(self.df["jobtitle"].cat.categories, dtype=object)
+                mask &= self._in_mask("jobtitle", titles[titles.str.contains(pattern, regex=True)].tolist())
+
+        for key in RANGE_COLUMNS:
+            labels = filters.get(key, [])
+            if key not in skip and labels and labels != ["All"]:
+                mask &= self._range_mask(key, labels)
+        return mask
+
+    def selection(self, filters):
+        """
+        Matching rows as a packed bitset: bitmap ORs per indexed column, ANDed across
+        columns, then ANDed with a mask for the filters the bitmaps don't cover.
+        """
+        index = self.bitmaps
+        bits = index.all_bits()
+        indexed = set()
+        for key in BITMAP_COLUMNS + list(BITMAP_RANGES):
+            values = filters.get(key, [])
+            if values and values != ["All"]:
+                bits &= index.union(key, values)
+                indexed.add(key)
+
+        if any(filters.get(key) for key in ["companyname", "jobtitle", "jobtitle_text"]):
+            bits &= np.packbits(self.mask(filters, skip=indexed))
+        return bits
+
+    def _matched_positions(self, filters, start=0, limit=None):
+        if self.bitmaps is None:
+            mask = self.mask(filters)
+            return start + np.flatnonzero(mask[start:])[:limit]
+        return self.bitmaps.positions(self.selection(filters), start, limit)
+
+    def _full_mask(self, filters):
+        if self.bitmaps is None:
+            return self.mask(filters)
+        return self.bitmaps.to_mask(self.selection(filters))
+
+    def count(self, filters):
+        if self.bitmaps is None:
+            return int(np.count_nonzero(self.mask(filters)))
+        return self.bitmaps.count(self.selection(filters))
+
+    def page_boundaries(self, filters):
+        """Last id of every full page (same shape as logic.get_page_boundaries)."""
+        matched = self.ids[self._matched_positions(filters)]
+        return matched[self.page_size - 1::self.page_size].tolist()
+
+    def page_after_id(self, filters, page_number):
+        if page_number <= 0:
+            return None
+        boundaries = self.page_boundaries(filters)
+        if not boundaries:
+            return None
+        return boundaries[min(page_number, len(boundaries)) - 1]
+
+    def _rows(self, positions):
+        """Full cache rows for the positions, read from Postgres by primary key, in id order."""
+        with engine.connect() as conn:
+            query = text("SELECT * FROM cached_full_contacts_data WHERE id = ANY(:ids) ORDER BY id")
+            return pd.read_sql(query, conn, params={"ids": self.ids[positions].tolist()})
+
+    def page(self, filters, after_id=None):
+        start = 0 if after_id is None else int(np.searchsorted(self.ids, after_id, side="right"))
+        return self._rows(self._matched_positions(filters, start, self.page_size))
+
+    def facet_counts(self, filters, columns):
+        """{column: {value: count}} over the filtered rows (bincount on the category codes)."""
+        mask = self._full_mask(filters)
+        facets = {}
+        for col in columns:
+            codes = self._codes[col][mask]
+            categories = self.df[col].cat.categories
+            counts = np.bincount(codes[codes >= 0], minlength=len(categories))
+            facets[col] = {categories[i]: int(counts[i]) for i in np.flatnonzero(counts)}
+        return facets
+
+def load_snapshot(version, page_size):
+    query = f"SELECT {', '.join(SNAPSHOT_COLUMNS)} FROM cached_full_contacts_data"
+    chunks = [_encode_chunk(chunk) for chunk in pd.read_sql(query, engine, chunksize=SNAPSHOT_LOAD_CHUNK_ROWS)]
+    return ContactsSnapshot(_concat_encoded(chunks), version, page_size)
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+_loading = False
+_failed_at = None
+
+def _load_in_background(version, page_size):
+    global _snapshot, _loading, _failed_at
+    try:
+        print(f"📦 Loading Data Explorer snapshot (data version {version})...")
+        snapshot = load_snapshot(version, page_size)
+        snapshot.bitmaps = load_or_build_bitmap_index(snapshot)
+        with _snapshot_lock:
+            _snapshot = snapshot
+        print(f"✅ Snapshot loaded with {len(snapshot)} contacts.")
+    except Exception as e:
+        with _snapshot_lock:
+            _failed_at = time.monotonic()
+        print(f"⚠️ Could not load the Data Explorer snapshot: {e}")
+    finally:
+        with _snapshot_lock:
+            _loading = False
+
+def get_snapshot(page_size):
+    """
+    The process-wide snapshot. When the cache data version has moved on, the new one is
+    loaded on a background thread and the previous snapshot keeps answering until it is
+    ready. None until the first load finishes (callers use the SQL path meanwhile).
+    """
+    global _loading
+    version = get_data_version()
+    with _snapshot_lock:
+        stale = _snapshot is None or _snapshot.version != version
+        retry_due = _failed_at is None or time.monotonic() - _failed_at >= SNAPSHOT_RETRY_SECONDS
+        if stale and not _loading and retry_due:
+            _loading = True
+            threading.Thread(
+                target=_load_in_background, args=(version, page_size), name="snapshot-load", daemon=True
+            ).start()
+        return _snapshot
@@ -0,0 +1,82 @@
+# app_backend/upload_validation.py
+
+### Chunk-level checks for validate_dataset (kept free of streamlit/DB imports so pool workers load fast) ###
+
+import re
+import pandas as pd
+
+_SCI_RE = re.compile(r"^\s*[-+]?\d+(\.\d+)?e[+-]?\d+\s*$", re.IGNORECASE)
+
+# Numeric-only values in these commonly texty fields risk Excel coercion
+TEXTY_COLS = ["comp_domain","empemail","comp_linkedin","comp_street","comp_city","comp_state","comp_country","jobtitle","firstname","lastname"]
+
+CONTACT_COLS = ["firstname", "lastname", "empemail"]
+
+SCI_ISSUE = "Scientific notation (Excel-lost precision risk)"
+NUMERIC_ISSUE = "Numeric-only in a text column (Excel may coerce/format)"
+
+def clean_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Same clean-up _load_new_data applies: fake nulls to '', drop fully empty rows, trim strings."""
+    chunk = chunk.replace(["N/A","NA","null","None"], "")
+    chunk = chunk.dropna(how="all")
+    for col in chunk.select_dtypes(include=['object']):
+        chunk[col] = chunk[col].str.strip()
+    return chunk
+
+def _hits(mask, values, row_numbers):
+    """Violation rows (row_number, column, value) for the True cells of a stacked (row, column) mask."""
+    hit = values[mask]
+    return pd.DataFrame({
+        "row_number": row_numbers.loc[hit.index.get_level_values(0)].to_numpy(),
+        "column": hit.index.get_level_values(1),
+        "value": hit.to_numpy(),
+    })
+
+def validate_chunk(chunk: pd.DataFrame, max_lengths: dict):
+    """
+    Runs the length, scientific-notation and numeric-only checks for one chunk.
+    All cells are stacked once into a single (row, column) Series and every
+    check is a vectorized mask over it.
+
+    Returns:
+    - (length_df, sci_df, numy_df) for the chunk, row_number = original index + 2
+    """
+    values = chunk.fillna("").astype(str).stack()
+    columns = values.index.get_level_values(1)
+    row_numbers = pd.Series(chunk.index + 2, index=chunk.index)
+
+    # 1) Length (exact len on post-trim strings)
+    lengths = values.str.len()
+    limits = pd.Series(columns.map(max_lengths), index=values.index)
+    length_df = _hits(lengths > limits, values, row_numbers)
+    hit_index = lengths[lengths > limits].index
+    length_df["length"] = lengths.loc[hit_index].to_numpy()
+    length_df["limit"] = limits.loc[hit_index].astype(int).to_numpy()
+    rows = hit_index.get_level_values(0)
+    for col in CONTACT_COLS:
+        length_df[col] = chunk.loc[rows, col].to_numpy() if col in chunk.columns else ''
+
+    # 2) Scientific notation (any column)
+    sci_df = _hits(values.str.match(_SCI_RE), values, row_numbers)
+    sci_df["issue"] = SCI_ISSUE
+
+    # 3) Numeric-only strings inside columns that should be text
+    numy_mask = columns.isin(TEXTY_COLS) & values.str.fullmatch(r"\d+").to_numpy()
+    numy_df = _hits(numy_mask, values, row_numbers)
+    numy_df["issue"] = NUMERIC_ISSUE
+
+    return length_df, sci_df, numy_df
+
+def combine_violations(frames, column_order):
+    """
+    Concatenates per-chunk violation frames and restores the report's order:
+    by column (in column_order), then by row. Empty results stay column-less.
+    """
+    frames = [f for f in frames if len(f)]
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(frames, ignore_index=True)
+    position = {col: i for i, col in enumerate(column_order)}
+    df["_pos"] = df["column"].map(position)
+    df = df.sort_values(["_pos", "row_number"], kind="stable").drop(columns="_pos")
+    return df.reset_index(drop=True)
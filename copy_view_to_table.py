@@ -1,5 +1,3 @@
-import pandas as pd
-from datetime import datetime
 from sqlalchemy import create_engine
 from urllib.parse import quote_plus
 
@@ -21,18 +19,10 @@ connection_string = f"postgresql+psycopg2://{user}:{password}@{DB_HOST}:{DB_PORT
 engine = create_engine(connection_string)
 
 def refresh_cached_contacts():
-    # Step 1: Load data from the view
-    query = "SELECT * FROM vw_full_contacts_data"
-    df = pd.read_sql(query, engine)
-
-    # Step 2: Add a last_updated column
-    df['last_updated'] = datetime.now()
-
-    # Step 3: Replace existing cached table
-    with engine.begin() as conn:
-        df.to_sql("cached_full_contacts_data", con=conn, index=False, if_exists="replace")
-
-    print(f"✅ cached_full_contacts_data updated at {datetime.now()} with {len(df)} records.")
+    # Same rebuild as app_backend.add_cached_contacts (range bucket codes, cache indexes,
+    # filter values and a data version bump), run against this script's engine
+    from app_backend.add_cached_contacts import refresh_cached_contacts as rebuild_cached_contacts
+    rebuild_cached_contacts(engine)
 
 if __name__ == "__main__":
     refresh_cached_contacts()
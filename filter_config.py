@@ -42,3 +42,30 @@ FILTERS = {
         "column_name": "annrev"
     }
 }
+
+# Range buckets for empsize and annrev: the one definition used for the stored bucket codes
+# (empsize_range/annrev_range), the filters and the display labels.
+# Right-closed: code i holds edges[i] < value <= edges[i + 1].
+EMPSIZE_BUCKET_EDGES = [float("-inf"), 1, 10, 50, 200, 500, 1000, 5000, 10000, float("inf")]
+EMPSIZE_BUCKET_LABELS = ["0", "2-10", "11-50", "51-200", "200-500", "500-1000", "1000-5000", "5000-10000", "10,000+"]
+
+ANNREV_BUCKET_EDGES = [
+    float("-inf"), 0, 1_000_000, 10_000_000, 100_000_000, 500_000_000,
+    1_000_000_000, 5_000_000_000, 10_000_000_000, float("inf"),
+]
+ANNREV_BUCKET_LABELS = ["0", "0 - 1M", "1M - 10M", "10M - 100M", "100M - 500M", "500M - 1B", "1B - 5B", "5B - 10B", "10B+"]
+
+def _bucket_ranges(edges, labels):
+    # label -> bounds ("gt" lower, "lte" upper; a missing bound is open) for the in-process snapshot
+    ranges = {}
+    for label, low, high in zip(labels, edges[:-1], edges[1:]):
+        bounds = {}
+        if low != float("-inf"):
+            bounds["gt"] = low
+        if high != float("inf"):
+            bounds["lte"] = high
+        ranges[label] = bounds
+    return ranges
+
+EMPSIZE_RANGES = _bucket_ranges(EMPSIZE_BUCKET_EDGES, EMPSIZE_BUCKET_LABELS)
+ANNREV_RANGES = _bucket_ranges(ANNREV_BUCKET_EDGES, ANNREV_BUCKET_LABELS)
@@ -10,14 +10,21 @@ import json
 from app_backend.database import get_db
 import io
 from io import BytesIO
-from openpyxl.styles import PatternFill
-from openpyxl.utils import get_column_letter
-from openpyxl import load_workbook
+import xlsxwriter
 import re
 from datetime import datetime
 import datetime
 import subprocess
 import os
+import threading
+import hashlib
+import multiprocessing
+from app_backend.result_cache import cached_result
+from app_backend.data_version import get_data_version
+from app_backend.range_buckets import RANGE_BUCKETS, add_range_buckets, bucket_case_sql, bucket_labels, update_range_buckets
+from app_backend.filter_options import rebuild_filter_option_values, add_filter_option_values, load_filter_option_values, load_location_hierarchy, search_filter_values, TYPEAHEAD_LIMIT
+from concurrent.futures import ProcessPoolExecutor
+from app_backend.upload_validation import TEXTY_COLS, clean_chunk, validate_chunk, combine_violations
 
 def log(msg):
     if 'import_log' in st.session_state:
@@ -188,7 +195,47 @@ def _load_new_data(uploaded) -> pd.DataFrame:
     df.dropna(how="all", inplace=True)
     return _trim_strings(df)
 
-_SCI_RE = re.compile(r"^\s*[-+]?\d+(\.\d+)?e[+-]?\d+\s*$", re.IGNORECASE)
+VALIDATION_CHUNK_ROWS = 50_000            # rows per validation chunk (bounds the check intermediates)
+VALIDATION_PARALLEL_MIN_BYTES = 20 * 1024 * 1024  # fan chunks out to a process pool above this file size
+# Never fork the (multi-threaded) Streamlit server: children could inherit held locks
+VALIDATION_MP_CONTEXT = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+def _upload_size(uploaded):
+    if isinstance(uploaded, str):
+        return os.path.getsize(uploaded)
+    return getattr(uploaded, "size", 0) or 0
+
+def _iter_upload_chunks(uploaded):
+    """Yields cleaned chunks of the upload; index keeps counting across chunks (row_number = idx + 2)."""
+    name = uploaded if isinstance(uploaded, str) else getattr(uploaded, "name", "")
+    name = name.lower()
+    if name.endswith(".csv"):
+        reader = pd.read_csv(uploaded, dtype=str, keep_default_na=False, chunksize=VALIDATION_CHUNK_ROWS)
+        for chunk in reader:
+            yield clean_chunk(chunk)
+    elif name.endswith((".xls",".xlsx")):
+        # Excel can't be streamed; slice it after one read
+        df = pd.read_excel(uploaded, dtype=str)  # read as strings to preserve length checks
+        for start in range(0, len(df), VALIDATION_CHUNK_ROWS):
+            yield clean_chunk(df.iloc[start:start + VALIDATION_CHUNK_ROWS])
+    else:
+        raise ValueError(f"Unrecognized file type: {name!r}")
+
+def _validate_chunks(chunks, executor=None, max_in_flight=1):
+    """Runs validate_chunk over the chunks (through executor when given), keeping at most max_in_flight queued."""
+    if executor is None:
+        for chunk in chunks:
+            yield chunk, validate_chunk(chunk, MAX_LENGTHS)
+        return
+
+    pending = []
+    for chunk in chunks:
+        pending.append((chunk, executor.submit(validate_chunk, chunk, MAX_LENGTHS)))
+        if len(pending) >= max_in_flight:
+            done_chunk, future = pending.pop(0)
+            yield done_chunk, future.result()
+    for done_chunk, future in pending:
+        yield done_chunk, future.result()
 
 def validate_dataset(uploaded_file):
     """
@@ -198,73 +245,42 @@ def validate_dataset(uploaded_file):
       length_violations (DataFrame),
       scientific_violations (DataFrame),
       numeric_in_text_violations (DataFrame)
+
+    The file is validated in VALIDATION_CHUNK_ROWS chunks with fused vectorized
+    checks (app_backend.upload_validation); large files fan chunks out to a process pool.
     """
-    df = _load_new_data(uploaded_file)
+    workers = os.cpu_count() or 1
+    parallel = workers > 1 and _upload_size(uploaded_file) >= VALIDATION_PARALLEL_MIN_BYTES
+    executor = ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context(VALIDATION_MP_CONTEXT)
+    ) if parallel else None
+
+    parts, length_frames, sci_frames, numy_frames = [], [], [], []
+    try:
+        for chunk, (length_df, sci_df, numy_df) in _validate_chunks(_iter_upload_chunks(uploaded_file), executor, 2 * workers):
+            parts.append(chunk)
+            length_frames.append(length_df)
+            sci_frames.append(sci_df)
+            numy_frames.append(numy_df)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
 
-    # 1) Column presence & order
+    df = pd.concat(parts) if parts else pd.DataFrame()
+
+    # Column presence & order
     missing = [c for c in EXPECTED_COLUMNS if c not in df.columns]
     unexpected = [c for c in df.columns if c not in EXPECTED_COLUMNS]
     order_ok = (df.columns.tolist() == EXPECTED_COLUMNS)
 
-    # 2) Length violations (exact len on post-trim strings)
-    length_rows = []
-    for col, max_len in MAX_LENGTHS.items():
-        if col in df.columns:
-            s = df[col].fillna("").astype(str)
-            too_long_mask = s.str.len() > max_len
-            for idx in s[too_long_mask].index:
-                val = s.at[idx]
-                length_rows.append({
-                    "row_number": idx + 2,
-                    "column": col,
-                    "value": val,
-                    "length": len(val),
-                    "limit": max_len,
-                    "firstname": df.at[idx, 'firstname'] if 'firstname' in df.columns else '',
-                    "lastname": df.at[idx, 'lastname'] if 'lastname' in df.columns else '',
-                    "empemail": df.at[idx, 'empemail'] if 'empemail' in df.columns else '',
-                })
-    length_df = pd.DataFrame(length_rows)
-
-    # 3) Scientific notation (any column)
-    sci_rows = []
-    for col in df.columns:
-        s = df[col].fillna("").astype(str)
-        hits = s[s.str.match(_SCI_RE)]
-        for idx, val in hits.items():
-            sci_rows.append({
-                "row_number": idx + 2,
-                "column": col,
-                "value": val,
-                "issue": "Scientific notation (Excel-lost precision risk)",
-            })
-    sci_df = pd.DataFrame(sci_rows)
-
-    # 4) Numeric‑only strings inside columns that should be text (risk of Excel coercion)
-    # Flag numeric-only values in fields commonly texty
-    TEXTY_COLS = ["comp_domain","empemail","comp_linkedin","comp_street","comp_city","comp_state","comp_country","jobtitle","firstname","lastname"]
-    numy_rows = []
-    for col in TEXTY_COLS:
-        if col in df.columns:
-            s = df[col].fillna("").astype(str)
-            hits = s[s.str.fullmatch(r"\d+")]
-            for idx, val in hits.items():
-                numy_rows.append({
-                    "row_number": idx + 2,
-                    "column": col,
-                    "value": val,
-                    "issue": "Numeric-only in a text column (Excel may coerce/format)",
-                })
-    numy_df = pd.DataFrame(numy_rows)
-
     return {
         "df": df,
         "missing_columns": missing,
         "unexpected_columns": unexpected,
         "column_order_valid": order_ok,
-        "length_violations": length_df,
-        "scientific_violations": sci_df,
-        "numeric_in_text_violations": numy_df,
+        "length_violations": combine_violations(length_frames, list(MAX_LENGTHS)),
+        "scientific_violations": combine_violations(sci_frames, df.columns.tolist()),
+        "numeric_in_text_violations": combine_violations(numy_frames, TEXTY_COLS),
     }
 
 
@@ -303,21 +319,13 @@ def prepare_validation_results(result_dict):
 
 def get_display_ranges(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Adds human-readable range columns for annrev and empsize based on filter bins.
-    Used for display purposes in Data Explorer.
+    Replaces the stored annrev_range/empsize_range bucket codes with their labels
+    (computed from the raw values for rows without codes). Used for display purposes in Data Explorer.
     """
-    df["annrev_range"] = pd.cut(
-        df["annrev"],
-        bins=[-1, 0, 1_000_000, 10_000_000, 100_000_000, 500_000_000, 1_000_000_000, 5_000_000_000, 10_000_000_000, float("inf")],
-        labels=["0", "0 - 1M", "1M - 10M", "10M - 100M", "100M - 500M", "500M - 1B", "1B - 5B", "5B - 10B", "10B+"],
-    )
-
-    df["empsize_range"] = pd.cut(
-        df["empsize"],
-        bins=[-1, 1, 10, 50, 200, 500, 1000, 5000, 10000, float("inf")],
-        labels=["0", "2-10", "11-50", "51-200", "200-500", "500-1000", "1000-5000", "5000-10000", "10,000+"],
-    )
-
+    if any(f"{column}_range" not in df.columns for column in RANGE_BUCKETS):
+        df = add_range_buckets(df)
+    for column in RANGE_BUCKETS:
+        df[f"{column}_range"] = bucket_labels(column, df[f"{column}_range"])
     return df
 
 def get_filter_options(column):
@@ -365,53 +373,114 @@ def load_query(query_name):
 import pandas as pd
 from pandas.errors import EmptyDataError
 
+UPLOADED_LIST_COLUMNS = {
+    "Company Name": "CompanyName",
+    "Domain Name": "comp_domain",
+    "Zip Code": "PostalCode"
+}
+UPLOADED_LIST_RETENTION = "7 days"
+
+MAX_PARSED_UPLOADS = 16
+_parsed_uploads = {}  # sha1 of file bytes -> (sql_column, values) or None
+
+def _parse_uploaded_list(file):
+    """Reads a suppression/TAL file once per content hash; returns (list_id, sql_column, values) or None."""
+    data = file.getvalue()
+    list_id = hashlib.sha1(data).hexdigest()
+    if list_id in _parsed_uploads:
+        parsed = _parsed_uploads[list_id]
+        return (list_id, *parsed) if parsed else None
+
+    parsed = None
+    try:
+        if file.name.endswith('.csv'):
+            try:
+                df = pd.read_csv(BytesIO(data), encoding='utf-8')
+            except UnicodeDecodeError:
+                df = pd.read_csv(BytesIO(data), encoding='ISO-8859-1')  # fallback for Excel-generated CSVs
+        elif file.name.endswith('.xlsx'):
+            df = pd.read_excel(BytesIO(data))
+        else:
+            df = None
+    except EmptyDataError:
+        df = None
+
+    if df is not None and not df.empty and not df.columns.empty and df.columns[0] in UPLOADED_LIST_COLUMNS:
+        filter_column = df.columns[0]
+        values = df[filter_column].dropna().astype(str).unique().tolist()
+        if values:
+            parsed = (UPLOADED_LIST_COLUMNS[filter_column], values)
+
+    _parsed_uploads[list_id] = parsed
+    while len(_parsed_uploads) > MAX_PARSED_UPLOADS:
+        _parsed_uploads.pop(next(iter(_parsed_uploads)))
+    return (list_id, *parsed) if parsed else None
+
+def register_uploaded_list(list_id, values, db_engine=engine):
+    """
+    Makes sure uploaded_filter_lists holds the list's values (COPY through a temp table,
+    so a list uploaded twice concurrently is stored once). Stale lists are purged.
+    """
+    with db_engine.connect() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM uploaded_filter_lists WHERE list_id = :list_id LIMIT 1"), {"list_id": list_id}
+        ).first()
+    if exists:
+        return
+
+    buffer = io.StringIO()
+    pd.DataFrame({"value": values}).to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+
+    raw_conn = db_engine.raw_connection()
+    cursor = raw_conn.cursor()
+    try:
+        cursor.execute("CREATE TEMP TABLE tmp_uploaded_list (value TEXT) ON COMMIT DROP")
+        cursor.copy_expert("COPY tmp_uploaded_list (value) FROM STDIN WITH CSV", buffer)
+        cursor.execute("""
+            INSERT INTO uploaded_filter_lists (list_id, value)
+            SELECT %s, value FROM tmp_uploaded_list
+            ON CONFLICT (list_id, value) DO NOTHING
+        """, (list_id,))
+        cursor.execute(
+            f"DELETE FROM uploaded_filter_lists WHERE created_at < NOW() - INTERVAL '{UPLOADED_LIST_RETENTION}'"
+        )
+        raw_conn.commit()
+    except Exception:
+        raw_conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        raw_conn.close()
+
 def get_uploaded_filter_conditions(file, mode):
+    """
+    Suppression (mode="exclude") / TAL (mode="include") filter for an uploaded list.
+    The list is stored once in uploaded_filter_lists and matched with an indexed
+    anti-join/semi-join, so the SQL carries a single list id instead of one bind per value.
+    """
     conditions = []
     params = {}
 
     if file:
-        try:
-            if file.name.endswith('.csv'):
-                if file.size == 0:
-                    return [], {}
-                try:
-                    df = pd.read_csv(file, encoding='utf-8')
-                except UnicodeDecodeError:
-                    df = pd.read_csv(file, encoding='ISO-8859-1')  # fallback for Excel-generated CSVs
-            elif file.name.endswith('.xlsx'):
-                if file.size == 0:
-                    return [], {}
-                df = pd.read_excel(file)
-            else:
-                return [], {}
-        except EmptyDataError:
+        if file.size == 0:
             return [], {}
-
-        if df.empty or df.columns.empty:
+        parsed = _parse_uploaded_list(file)
+        if parsed is None:
             return [], {}
 
-        filter_column = df.columns[0]
-        if filter_column not in ["Company Name", "Domain Name", "Zip Code"]:
-            return [], {}
-
-        column_map = {
-            "Company Name": "CompanyName",
-            "Domain Name": "comp_domain",
-            "Zip Code": "PostalCode"
-        }
-        sql_column = column_map[filter_column]
-        values = df[filter_column].dropna().astype(str).unique()
-
-        placeholders = []
-        for i, val in enumerate(values):
-            key = f"{mode}_{i}"
-            placeholders.append(f":{key}")
-            params[key] = val
+        list_id, sql_column, values = parsed
+        register_uploaded_list(list_id, values)
 
+        key = f"{mode}_list_id"
+        params[key] = list_id
+        lookup = f"""SELECT 1 FROM uploaded_filter_lists u
+                     WHERE u.list_id = :{key} AND u.value = cached_full_contacts_data.{sql_column}"""
         if mode == "exclude":
-            conditions.append(f"{sql_column} NOT IN ({', '.join(placeholders)})")
+            # NOT IN never matched NULLs; keep that behaviour
+            conditions.append(f"({sql_column} IS NOT NULL AND NOT EXISTS ({lookup}))")
         elif mode == "include":
-            conditions.append(f"{sql_column} IN ({', '.join(placeholders)})")
+            conditions.append(f"EXISTS ({lookup})")
 
     return conditions, params
 
@@ -448,9 +517,27 @@ def load_query_filters(query_id):
         st.error("No filters or campaign name found for the selected query.")
         return None, None
 
+def _bulk_insert_returning(db_session, statement, params):
+    """
+    Runs one batched INSERT ... RETURNING and commits it.
+    Rolls back on failure so no half-written dimension rows are left behind.
+    """
+    try:
+        rows = db_session.execute(text(statement), params).fetchall()
+        db_session.commit()
+    except Exception:
+        db_session.rollback()
+        raise
+    return rows
+
+def _clean_text(series):
+    """Stripped string values with missing values as ''."""
+    return series.where(series.notna(), '').astype(str).str.strip()
+
 def get_or_create_dim_ids(df, db_session, dim_table, column, id_column, create_missing=False):
     """
     Generic function to retrieve or insert dimension IDs.
+    Missing values are inserted in one batched statement.
 
     Parameters:
     - df: DataFrame containing the values to look up
@@ -465,28 +552,22 @@ def get_or_create_dim_ids(df, db_session, dim_table, column, id_column, create_m
     """
     records = db_session.execute(text(f"SELECT id, name FROM {dim_table}")).fetchall()
     value_map = {row.name.strip().lower(): row.id for row in records}
-    result_ids = []
-
-    for val in df[column]:
-        if pd.isna(val) or str(val).strip() == "":
-            result_ids.append(None)
-            continue
 
-        val_clean = str(val).strip().lower()
-        existing_id = value_map.get(val_clean)
-
-        if existing_id:
-            result_ids.append(existing_id)
-        elif create_missing:
-            insert_stmt = text(f"INSERT INTO {dim_table}(name) VALUES (:name) RETURNING id")
-            new_id = db_session.execute(insert_stmt, {"name": val.strip()}).scalar()
-            db_session.commit()
-            value_map[val_clean] = new_id
-            result_ids.append(new_id)
-        else:
-            result_ids.append(None)
+    values = _clean_text(df[column])
+    keys = values.str.lower()
+
+    if create_missing:
+        missing = values[(keys != '') & ~keys.isin(set(value_map))]
+        missing = missing[~missing.str.lower().duplicated()]
+        if not missing.empty:
+            inserted = _bulk_insert_returning(
+                db_session,
+                f"INSERT INTO {dim_table}(name) SELECT UNNEST(CAST(:names AS text[])) RETURNING id, name",
+                {"names": missing.tolist()}
+            )
+            value_map.update({row.name.strip().lower(): row.id for row in inserted})
 
-    return result_ids
+    return [value_map.get(key) if key else None for key in keys]
 
 def resolve_dim_ids(df_source, db_session, dim_table, column_name, id_column_name):
     """
@@ -511,40 +592,36 @@ def resolve_dim_ids(df_source, db_session, dim_table, column_name, id_column_nam
 def get_existing_company_ids(df, db_session):
     """
     Checks if company already exists in the database using comp_domain first, then companyname.
+    Resolves the whole frame with one set-based query per key instead of per-row lookups
+    (backed by the lower() indexes of migration 16).
     Returns a tuple of (matched_ids_dict, unmatched_rows_df)
     """
-    matched_company_ids = {}
-    unmatched_rows = []
-
-    for _, row in df.iterrows():
-        idx = row['index']
-        domain = str(row['comp_domain']).strip().lower() if pd.notna(row['comp_domain']) else None
-        name = str(row['companyname']).strip().lower() if pd.notna(row['companyname']) else None
 
-        company_id = None
+    domains = df['comp_domain'].where(df['comp_domain'].notna(), '').astype(str).str.strip().str.lower()
+    names = df['companyname'].where(df['companyname'].notna(), '').astype(str).str.strip().str.lower()
 
-        if domain:
-            result = db_session.execute(
-                text("SELECT id FROM fact_companies WHERE LOWER(comp_domain) = :domain LIMIT 1"),
-                {"domain": domain}
-            ).fetchone()
-            if result:
-                company_id = result[0]
+    def resolve(column, keys):
+        # Lowest id wins when several companies share a key
+        distinct_keys = [key for key in keys.unique().tolist() if key]
+        if not distinct_keys:
+            return pd.Series(None, index=keys.index, dtype=object)
+        result = db_session.execute(text(f"""
+            SELECT DISTINCT ON (LOWER({column})) LOWER({column}) AS match_key, id
+            FROM fact_companies
+            WHERE LOWER({column}) = ANY(:keys)
+            ORDER BY LOWER({column}), id
+        """), {"keys": distinct_keys}).fetchall()
+        key_map = {row.match_key: row.id for row in result}
+        return keys.map(key_map)
 
-        if not company_id and name:
-            result = db_session.execute(
-                text("SELECT id FROM fact_companies WHERE LOWER(name) = :name LIMIT 1"),
-                {"name": name}
-            ).fetchone()
-            if result:
-                company_id = result[0]
+    company_ids = resolve('comp_domain', domains)
+    unresolved = company_ids.isna()
+    if unresolved.any():
+        company_ids[unresolved] = resolve('name', names[unresolved])
 
-        if company_id:
-            matched_company_ids[idx] = company_id
-        else:
-            unmatched_rows.append(row)
-
-    return matched_company_ids, pd.DataFrame(unmatched_rows)
+    matched = company_ids.notna()
+    matched_company_ids = dict(zip(df.loc[matched, 'index'], company_ids[matched].astype(int).tolist()))
+    return matched_company_ids, df[~matched]
 
 def prepare_unique_companies(df_unmatched_companies):
     df_unique = df_unmatched_companies[
@@ -573,159 +650,139 @@ def load_new_data(file_path):
 def get_or_create_jobtitle_ids(df, db_session):
     """
     Resolves jobtitle IDs based on both jobtitle name and manlevel_id.
-    Inserts new records if not found.
+    Inserts new records if not found, in one batched statement.
     """
     # Load existing jobtitles with manlevel_id
     existing = db_session.execute(text("SELECT id, name, manlevel_id FROM dim_jobtitles")).fetchall()
     jobtitle_map = {(row.name.strip().lower(), row.manlevel_id): row.id for row in existing}
 
-    result_ids = []
-
-    for _, row in df.iterrows():
-        title = str(row['jobtitle']).strip() if pd.notna(row['jobtitle']) else ""
-        manlevel_id = row['manlevel_id']
-
-        if not title or pd.isna(manlevel_id):
-            result_ids.append(None)
-            continue
-
-        key = (title.lower(), manlevel_id)
-        jobtitle_id = jobtitle_map.get(key)
-
-        if jobtitle_id:
-            result_ids.append(jobtitle_id)
-        else:
-            # Insert new jobtitle with manlevel_id
-            insert_stmt = text("""
-                INSERT INTO dim_jobtitles(name, manlevel_id)
-                VALUES (:name, :manlevel_id)
-                RETURNING id
-            """)
-            new_id = db_session.execute(insert_stmt, {
-                "name": title,
-                "manlevel_id": manlevel_id
-            }).scalar()
-            db_session.commit()
-            jobtitle_map[key] = new_id
-            result_ids.append(new_id)
+    titles = _clean_text(df['jobtitle'])
+    valid = (titles != '') & df['manlevel_id'].notna()
+    keys = list(zip(titles.str.lower(), df['manlevel_id']))
+
+    # Collect unknown (title, manlevel_id) pairs, first spelling wins
+    missing = {}
+    for title, key, is_valid in zip(titles, keys, valid):
+        if is_valid and key not in jobtitle_map and key not in missing:
+            missing[key] = title
+
+    if missing:
+        inserted = _bulk_insert_returning(db_session, """
+            INSERT INTO dim_jobtitles(name, manlevel_id)
+            SELECT * FROM UNNEST(CAST(:names AS text[]), CAST(:manlevel_ids AS integer[]))
+            RETURNING id, name, manlevel_id
+        """, {
+            "names": list(missing.values()),
+            "manlevel_ids": [int(manlevel_id) for _, manlevel_id in missing]
+        })
+        jobtitle_map.update({(row.name.strip().lower(), row.manlevel_id): row.id for row in inserted})
 
-    return result_ids
+    return [jobtitle_map.get(key) if is_valid else None for key, is_valid in zip(keys, valid)]
 
 def get_or_create_dim_id_value_pairs(df, db_session, dim_table, source_column, match_column):
     """
     Looks up or inserts values into a dimension table and returns a list of IDs.
+    Missing values are inserted in one batched statement.
     Includes special handling for dim_countries which requires a subregion_id.
     """
     records = db_session.execute(text(f"SELECT id, {match_column} FROM {dim_table}")).fetchall()
     value_map = {row[1].strip().lower(): row[0] for row in records}
 
-    result_ids = []
-
-    for val in df[source_column]:
-        if pd.isna(val) or str(val).strip() == "":
-            result_ids.append(None)
-            continue
+    values = _clean_text(df[source_column])
+    keys = values.str.lower()
 
-        val_clean = str(val).strip().lower()
-        dim_id = value_map.get(val_clean)
-
-        if dim_id:
-            result_ids.append(dim_id)
+    missing = values[(keys != '') & ~keys.isin(set(value_map))]
+    missing = missing[~missing.str.lower().duplicated()]
+    if not missing.empty:
+        if dim_table == "dim_countries":
+            statement = f"""
+                INSERT INTO {dim_table}({match_column}, subregion_id)
+                SELECT UNNEST(CAST(:vals AS text[])), 999999 RETURNING id, {match_column}
+            """
         else:
-            if dim_table == "dim_countries":
-                insert_stmt = text(f"""
-                    INSERT INTO {dim_table}({match_column}, subregion_id)
-                    VALUES (:val, 999999) RETURNING id
-                """)
-                new_id = db_session.execute(insert_stmt, {"val": str(val).strip()}).scalar()
-            else:
-                insert_stmt = text(f"INSERT INTO {dim_table}({match_column}) VALUES (:val) RETURNING id")
-                new_id = db_session.execute(insert_stmt, {"val": str(val).strip()}).scalar()
+            statement = f"INSERT INTO {dim_table}({match_column}) SELECT UNNEST(CAST(:vals AS text[])) RETURNING id, {match_column}"
+        inserted = _bulk_insert_returning(db_session, statement, {"vals": missing.tolist()})
+        value_map.update({row[1].strip().lower(): row[0] for row in inserted})
 
-            db_session.commit()
-            value_map[val_clean] = new_id
-            result_ids.append(new_id)
+    return [value_map.get(key) if key else None for key in keys]
 
-    return result_ids
+COMPANY_TEXT_COLUMNS = ["name", "comp_domain", "comp_phone", "comp_linkedin"]
 
 def insert_new_companies(df_unique, db_session):
     """
-    Inserts new companies into fact_companies and returns a map of index -> new company_id
+    Inserts new companies into fact_companies in one batched statement and returns
+    a map of index -> new company_id
     """
-    company_id_map = {}
-
-    for _, row in df_unique.iterrows():
-        insert_stmt = text("""
-            INSERT INTO fact_companies (
-                name, comp_domain, comp_phone, comp_linkedin,
-                address_id, city_id, state_id, postalcode_id, country_id, industry_id,
-                annrev, empsize
-            ) VALUES (
-                :name, :comp_domain, :comp_phone, :comp_linkedin,
-                :address_id, :city_id, :state_id, :postalcode_id, :country_id, :industry_id,
-                :annrev, :empsize
-            ) RETURNING id
-        """)
+    if df_unique.empty:
+        return {}
 
-        result = db_session.execute(insert_stmt, {
-            "name": row["name"],
-            "comp_domain": row["comp_domain"],
-            "comp_phone": row["comp_phone"],
-            "comp_linkedin": row["comp_linkedin"],
-            "address_id": row.get("address_id"),
-            "city_id": row.get("city_id"),
-            "state_id": row.get("state_id"),
-            "postalcode_id": row.get("postalcode_id"),
-            "country_id": row.get("country_id"),
-            "industry_id": row.get("industry_id"),
-            "annrev": row["annrev"],
-            "empsize": row["empsize"]
-        })
+    columns = ["name", "comp_domain", "comp_phone", "comp_linkedin",
+               "address_id", "city_id", "state_id", "postalcode_id", "country_id", "industry_id",
+               "annrev", "empsize"]
+    df_insert = df_unique.reindex(columns=["index"] + columns)
+    df_insert = df_insert.astype(object).where(df_insert.notna(), None)
 
-        db_session.commit()
-        company_id = result.scalar()
-        company_id_map[row["index"]] = company_id
+    # Excel columns mix str and int (phones, postal codes); text[] arrays need all strings
+    params = {
+        col: [None if v is None else str(v) for v in df_insert[col]] if col in COMPANY_TEXT_COLUMNS else df_insert[col].tolist()
+        for col in columns
+    }
+    inserted = _bulk_insert_returning(db_session, """
+        INSERT INTO fact_companies (
+            name, comp_domain, comp_phone, comp_linkedin,
+            address_id, city_id, state_id, postalcode_id, country_id, industry_id,
+            annrev, empsize
+        )
+        SELECT * FROM UNNEST(
+            CAST(:name AS text[]), CAST(:comp_domain AS text[]), CAST(:comp_phone AS text[]), CAST(:comp_linkedin AS text[]),
+            CAST(:address_id AS integer[]), CAST(:city_id AS integer[]), CAST(:state_id AS integer[]),
+            CAST(:postalcode_id AS integer[]), CAST(:country_id AS integer[]), CAST(:industry_id AS integer[]),
+            CAST(:annrev AS numeric[]), CAST(:empsize AS integer[])
+        )
+        RETURNING id, name, comp_domain
+    """, params)
+
+    # df_unique is unique on (comp_domain, name), so that pair maps rows back to their new id.
+    # Look it up with the bound (stringified) values: RETURNING gives "1800", not 1800
+    new_ids = {(row.name, row.comp_domain): row.id for row in inserted}
+    company_id_map = {
+        index: new_ids.get((name, domain))
+        for index, name, domain in zip(df_insert["index"], params["name"], params["comp_domain"])
+    }
 
+    update_company_index(df_unique.assign(company_id=df_unique["index"].map(company_id_map)))
     return company_id_map
 
 def get_or_create_state_ids(df, db_session):
     """
     Resolves state IDs using both state name and country_id.
-    Inserts new state records if needed.
+    Inserts new state records if needed, in one batched statement.
     """
     existing = db_session.execute(text("SELECT id, name, country_id FROM dim_states")).fetchall()
     state_map = {(row.name.strip().lower(), row.country_id): row.id for row in existing}
 
-    result_ids = []
-
-    for _, row in df.iterrows():
-        state = str(row['compstate']).strip() if pd.notna(row['compstate']) else ""
-        country_id = row['country_id']
-
-        if not state or pd.isna(country_id):
-            result_ids.append(None)
-            continue
-
-        key = (state.lower(), country_id)
-        existing_id = state_map.get(key)
-
-        if existing_id:
-            result_ids.append(existing_id)
-        else:
-            insert_stmt = text("""
-                INSERT INTO dim_states(name, country_id)
-                VALUES (:name, :country_id)
-                RETURNING id
-            """)
-            new_id = db_session.execute(insert_stmt, {
-                "name": state,
-                "country_id": country_id
-            }).scalar()
-            db_session.commit()
-            state_map[key] = new_id
-            result_ids.append(new_id)
+    states = _clean_text(df['compstate'])
+    valid = (states != '') & df['country_id'].notna()
+    keys = list(zip(states.str.lower(), df['country_id']))
+
+    # Collect unknown (state, country_id) pairs, first spelling wins
+    missing = {}
+    for state, key, is_valid in zip(states, keys, valid):
+        if is_valid and key not in state_map and key not in missing:
+            missing[key] = state
+
+    if missing:
+        inserted = _bulk_insert_returning(db_session, """
+            INSERT INTO dim_states(name, country_id)
+            SELECT * FROM UNNEST(CAST(:names AS text[]), CAST(:country_ids AS integer[]))
+            RETURNING id, name, country_id
+        """, {
+            "names": list(missing.values()),
+            "country_ids": [int(country_id) for _, country_id in missing]
+        })
+        state_map.update({(row.name.strip().lower(), row.country_id): row.id for row in inserted})
 
-    return result_ids
+    return [state_map.get(key) if is_valid else None for key, is_valid in zip(keys, valid)]
 
 def check_company_existence(df, db):
     query = text("SELECT name, comp_domain FROM fact_companies")
@@ -779,48 +836,148 @@ def validate_column(df, column, valid_values):
 
     return df
 
+# --------------------------- Database-side validation -----------------------
+def _normalized_keys(series):
+    """Lowercased, stripped values with missing values as '' (matches COALESCE(LOWER(TRIM(..)), ''))."""
+    return series.where(series.notna(), '').astype(str).str.strip().str.lower()
+
+def find_missing_keys(db, table, keys):
+    """
+    Ships the distinct upload keys to Postgres as arrays and returns the ones with no
+    match in table, via a NOT EXISTS anti-join on COALESCE(LOWER(TRIM(column)), '').
+
+    Parameters:
+    - db: Active SQLAlchemy DB session
+    - table: Table to check against (e.g., 'dim_cities', 'fact_companies')
+    - keys: dict of table column -> normalized key Series (all the same length)
+
+    Returns:
+    - DataFrame of the missing key combinations, one column per table column
+    """
+    columns = list(keys)
+    distinct = pd.DataFrame(keys).drop_duplicates()
+    aliases = [f"k{i}" for i in range(len(columns))]
+
+    unnest = ", ".join(f"CAST(:{alias} AS text[])" for alias in aliases)
+    match = " AND ".join(
+        f"COALESCE(LOWER(TRIM(t.{column})), '') = u.{alias}" for column, alias in zip(columns, aliases)
+    )
+    result = db.execute(text(f"""
+        SELECT {', '.join(aliases)}
+        FROM UNNEST({unnest}) AS u({', '.join(aliases)})
+        WHERE NOT EXISTS (SELECT 1 FROM {table} t WHERE {match})
+    """), {alias: distinct[column].tolist() for column, alias in zip(columns, aliases)})
+    return pd.DataFrame(result.fetchall(), columns=columns)
+
+def _is_missing(keys, missing):
+    """Boolean mask (aligned with keys) of rows whose key combination is in missing."""
+    df_keys = pd.DataFrame(keys)
+    merged = df_keys.merge(missing.drop_duplicates(), on=list(keys), how='left', indicator=True)
+    return pd.Series((merged['_merge'] == 'both').to_numpy(), index=df_keys.index)
+
+def validate_column_in_db(df, column, dim_table, db):
+    """Database-side validate_column: same status column, without loading dim_table into Python."""
+    keys = {"name": _normalized_keys(df[column])}
+    exists = df[column].notna() & ~_is_missing(keys, find_missing_keys(db, dim_table, keys))
+    if column in ["emailstatus", "managementlevel"]:
+        exists |= keys["name"] == ""  # treat empty as valid
+
+    col_index = df.columns.get_loc(column)
+    df.insert(col_index + 1, f"{column}_status", exists.map({True: "Exists", False: "Not exists"}))
+    return df
+
+def check_company_existence_in_db(df, db):
+    """Database-side check_company_existence on (name, comp_domain)."""
+    keys = {"name": _normalized_keys(df["companyname"]), "comp_domain": _normalized_keys(df["comp_domain"])}
+    is_new = _is_missing(keys, find_missing_keys(db, "fact_companies", keys))
+    df.insert(df.columns.get_loc("comp_domain") + 1, "company_status", is_new.map({True: "New", False: "Update"}))
+    return df
+
+def check_contact_existence_in_db(df, db):
+    """Database-side check_contact_existence on (emplinkedin, empemail)."""
+    keys = {"emplinkedin": _normalized_keys(df["emplinkedin"]), "empemail": _normalized_keys(df["empemail"])}
+    is_new = _is_missing(keys, find_missing_keys(db, "fact_contacts", keys))
+    df.insert(df.columns.get_loc("empemail") + 1, "contact_status", is_new.map({True: "New", False: "Update"}))
+    return df
+
 # --------------------------- Validation Logic -----------------------
-def run_validation(df):
+# Columns to validate and corresponding dimension tables
+VALIDATION_MAP = {
+    "jobtitle": "dim_jobtitles",
+    "managementlevel": "dim_manlevels",
+    "emailstatus": "dim_emailstatuses",
+    "country": "dim_countries",
+    "compstate": "dim_states",
+    "city": "dim_cities",
+    "postalcode": "dim_postalcodes",
+    "address": "dim_addresses",
+    "industry": "dim_industries"
+}
+
+def run_validation(df, mode="python"):
+    """
+    Adds *_status columns for dimension values and company/contact existence.
+    mode="database" classifies the upload's distinct keys in Postgres with anti-joins
+    instead of loading whole dimension and fact tables into Python sets.
+    """
+    in_db = mode == "database"
     with next(get_db()) as db:
         for column, dim_table in VALIDATION_MAP.items():
             if column in df.columns:
-                valid_values = get_existing_values(dim_table, db)
-                df = validate_column(df, column, valid_values)
+                if in_db:
+                    df = validate_column_in_db(df, column, dim_table, db)
+                else:
+                    valid_values = get_existing_values(dim_table, db)
+                    df = validate_column(df, column, valid_values)
 
         if "companyname" in df.columns and "comp_domain" in df.columns:
-            df = check_company_existence(df, db)
+            df = check_company_existence_in_db(df, db) if in_db else check_company_existence(df, db)
 
         if "emplinkedin" in df.columns and "empemail" in df.columns:
-            df = check_contact_existence(df, db)
+            df = check_contact_existence_in_db(df, db) if in_db else check_contact_existence(df, db)
 
     return df
 
-def export_to_excel_colored(df):
-    buffer = BytesIO()
-    df.to_excel(buffer, index=False)
-    buffer.seek(0)
-
-    wb = load_workbook(buffer)
-    ws = wb.active
-
-    green_fill = PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid")
-    red_fill = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
+def export_to_excel_colored(df, output=None):
+    """
+    Writes df to xlsx in a single pass (xlsxwriter constant-memory mode, rows are
+    flushed as they are written) and colours every *_status column with one
+    range-level conditional format instead of styling cells one by one.
 
-    for col_idx, col_name in enumerate(df.columns, 1):
-        if col_name.endswith("_status"):
-            for row in range(2, ws.max_row + 1):
-                cell = ws[f"{get_column_letter(col_idx)}{row}"]
-                if cell.value == "Exists":
-                    cell.fill = green_fill
-                    cell.font = cell.font.copy(color="000000")  # Black font
-                elif cell.value == "Not exists":
-                    cell.fill = red_fill
-                    cell.font = cell.font.copy(color="FFFFFF")  # White font
+    Parameters:
+    - df: DataFrame to export
+    - output: file path or file-like object; a new BytesIO when omitted
 
-    final_output = BytesIO()
-    wb.save(final_output)
-    final_output.seek(0)
-    return final_output
+    Returns:
+    - output (rewound when it is a BytesIO)
+    """
+    if output is None:
+        output = BytesIO()
+
+    workbook = xlsxwriter.Workbook(output, {"constant_memory": True, "nan_inf_to_errors": True})
+    ws = workbook.add_worksheet()
+    green_format = workbook.add_format({"bg_color": "#C6EFCE", "font_color": "#000000"})  # Black font
+    red_format = workbook.add_format({"bg_color": "#FFC7CE", "font_color": "#FFFFFF"})  # White font
+    # Status value -> fill; company_status/contact_status ("New"/"Update") keep their green fill
+    status_formats = {"Exists": green_format, "Not exists": red_format, "New": green_format, "Update": green_format}
+
+    ws.write_row(0, 0, [str(col) for col in df.columns])
+    values = df.astype(object).where(df.notna(), None)
+    for row_idx, row in enumerate(values.itertuples(index=False, name=None), 1):
+        ws.write_row(row_idx, 0, row)
+
+    if len(df):
+        for col_idx, col_name in enumerate(df.columns):
+            if str(col_name).endswith("_status"):
+                for status, status_format in status_formats.items():
+                    ws.conditional_format(1, col_idx, len(df), col_idx, {
+                        "type": "cell", "criteria": "==", "value": f'"{status}"', "format": status_format
+                    })
+
+    workbook.close()
+    if isinstance(output, BytesIO):
+        output.seek(0)
+    return output
 
 def style_dataframe(df):
     def highlight_status(val):
@@ -930,16 +1087,7 @@ def enrich_and_merge_dim(df_base, df_target, source_column, dim_table, dim_colum
 
     # Special logic for fact_companies using a check_key
     if dim_table == 'fact_companies':
-        df_dim['check_key'] = df_target[['comp_domain', 'comp_linkedin', 'name']].fillna('').agg('|'.join, axis=1).str.lower().str.strip()
-
-        with engine.begin() as conn:
-            result = conn.execute(text("SELECT id, comp_domain, comp_linkedin, name FROM fact_companies"))
-            df_existing = pd.DataFrame(result.fetchall(), columns=['id', 'comp_domain', 'comp_linkedin', 'name'])
-
-        df_existing['check_key'] = df_existing[['comp_domain', 'comp_linkedin', 'name']].fillna('').agg('|'.join, axis=1).str.lower().str.strip()
-
-        merged_ids = df_dim.merge(df_existing[['id', 'check_key']], on='check_key', how='left')
-        df_dim[id_column] = merged_ids['id']
+        df_dim[id_column] = lookup_company_ids(df_target)
 
     else:
         # Standard logic for other dimension tables
@@ -1095,34 +1243,8 @@ def extract_revenue_lower_bound(revenue_str):
 
 def match_companies_by_domain_or_linkedin(df_companies):
     df_companies = df_companies.copy()
-
-    # Normalize individual fields
-    df_companies['normalized_domain'] = df_companies['comp_domain'].fillna('').apply(normalize_domain)
-    df_companies['normalized_linkedin'] = df_companies['comp_linkedin'].fillna('').apply(normalize_domain)
-    df_companies['normalized_name'] = df_companies['name'].fillna('').str.lower().str.strip()
-
-    # Build match key
-    df_companies['match_key'] = df_companies[['normalized_domain', 'normalized_linkedin', 'normalized_name']].agg('|'.join, axis=1)
-
-    with engine.begin() as conn:
-        result = conn.execute(text("SELECT id AS company_id, comp_domain, comp_linkedin, name FROM fact_companies"))
-        df_existing = pd.DataFrame(result.fetchall(), columns=['company_id', 'comp_domain', 'comp_linkedin', 'name'])
-
-    # Normalize database columns before building match_key
-    df_existing['normalized_domain'] = df_existing['comp_domain'].fillna('').apply(normalize_domain)
-    df_existing['normalized_linkedin'] = df_existing['comp_linkedin'].fillna('').apply(normalize_domain)
-    df_existing['normalized_name'] = df_existing['name'].fillna('').str.lower().str.strip()
-
-    # Now safely build the match key
-    df_existing['match_key'] = df_existing[['normalized_domain', 'normalized_linkedin', 'normalized_name']].agg('|'.join, axis=1)
-
-    # Perform the merge
-    df_matched = df_companies.merge(df_existing[['company_id', 'match_key']], on='match_key', how='left')
-
-    # Clean up
-    df_matched.drop(columns=['match_key', 'normalized_domain', 'normalized_linkedin', 'normalized_name'], inplace=True)
-
-    return df_matched
+    df_companies['company_id'] = lookup_company_ids(df_companies)
+    return df_companies
 
 def insert_unmatched_companies(df_companies):
     """
@@ -1161,6 +1283,7 @@ def insert_unmatched_companies(df_companies):
 
     # Step 3: Merge new IDs back into df_companies
     inserted_df = pd.DataFrame(inserted_ids)
+    update_company_index(df_new.drop(columns=['company_id']).merge(inserted_df, on='index'))
     df = df.merge(inserted_df, on='index', how='left', suffixes=('', '_new'))
 
     # Fill missing company_id from inserted
@@ -1181,18 +1304,125 @@ def normalize_domain(domain):
     domain = domain.strip('/')
     return domain
 
+def normalize_domains(domains: pd.Series) -> pd.Series:
+    """
+    Vectorized normalize_domain for a whole column. Missing values become ''.
+    """
+    return (
+        domains.fillna('').astype(str).str.lower().str.strip()
+        .str.replace(r'^https?://', '', regex=True)
+        .str.replace(r'^www\.', '', regex=True)
+        .str.strip('/')
+    )
+
+# --------------------------- Company match index ---------------------------
+# Process-wide lookup of fact_companies keyed by normalized domain, LinkedIn, name
+# and their composite. Rebuilt from the table when the cache data version changes
+# (bulk SQL upserts, refreshes from other processes); companies inserted anywhere
+# since the last load are picked up by id watermark on every lookup, and this
+# process's own inserts/updates are applied directly.
+COMPANY_INDEX_FIELDS = ['match_key', 'domain', 'linkedin', 'name']
+_company_index = None
+_company_index_lock = threading.Lock()
+
+def _company_keys(df_companies: pd.DataFrame) -> pd.DataFrame:
+    keys = pd.DataFrame(index=df_companies.index)
+    keys['domain'] = normalize_domains(df_companies['comp_domain'])
+    keys['linkedin'] = normalize_domains(df_companies['comp_linkedin'])
+    keys['name'] = df_companies['name'].fillna('').astype(str).str.lower().str.strip()
+    keys['match_key'] = keys['domain'] + '|' + keys['linkedin'] + '|' + keys['name']
+    return keys
+
+def _index_companies(index: dict, df_companies: pd.DataFrame):
+    """
+    Adds (or re-keys) companies in the index. df_companies needs company_id,
+    comp_domain, comp_linkedin and name.
+    """
+    df_companies = df_companies[df_companies['company_id'].notna()]
+    keys = _company_keys(df_companies)
+    company_ids = df_companies['company_id'].astype(int).tolist()
+
+    # Drop the old keys of companies whose domain/LinkedIn/name changed
+    for company_id in company_ids:
+        old_keys = index['by_id'].pop(company_id, None)
+        if old_keys:
+            for field, old_key in zip(COMPANY_INDEX_FIELDS, old_keys):
+                if index[field].get(old_key) == company_id:
+                    del index[field][old_key]
+
+    for field in COMPANY_INDEX_FIELDS:
+        values = keys[field].tolist()
+        index[field].update((key, company_id) for key, company_id in zip(values, company_ids)
+                            if key or field == 'match_key')
+    index['by_id'].update(zip(company_ids, zip(*(keys[field].tolist() for field in COMPANY_INDEX_FIELDS))))
+
+def _load_companies(index: dict):
+    """
+    Indexes the fact_companies rows above the index's loaded_id watermark. The watermark
+    only moves with rows read back from the table, never with this process's own inserts.
+    """
+    with engine.connect() as conn:
+        result = conn.execute(
+            text("SELECT id, comp_domain, comp_linkedin, name FROM fact_companies WHERE id > :after_id ORDER BY id"),
+            {"after_id": index['loaded_id']}
+        )
+        df_companies = pd.DataFrame(result.fetchall(), columns=['company_id', 'comp_domain', 'comp_linkedin', 'name'])
+    if not df_companies.empty:
+        _index_companies(index, df_companies)
+        index['loaded_id'] = int(df_companies['company_id'].max())
+
+def get_company_index() -> dict:
+    """
+    Returns the company key index: fully reloaded on first use and whenever the cache
+    data version changed, otherwise topped up with companies inserted since the last load.
+    """
+    global _company_index
+    version = get_data_version()
+    with _company_index_lock:
+        if _company_index is None or _company_index['data_version'] != version:
+            index = {field: {} for field in COMPANY_INDEX_FIELDS + ['by_id']}
+            index.update(data_version=version, loaded_id=0)
+            _load_companies(index)
+            _company_index = index
+        else:
+            _load_companies(_company_index)
+        return _company_index
+
+def update_company_index(df_companies: pd.DataFrame):
+    """
+    Applies inserted/updated companies to the index (no-op until the index is built).
+    """
+    with _company_index_lock:
+        if _company_index is not None and not df_companies.empty:
+            _index_companies(_company_index, df_companies)
+
+def invalidate_company_index():
+    """
+    Drops the index so the next lookup reloads it, e.g. after bulk SQL upserts.
+    """
+    global _company_index
+    with _company_index_lock:
+        _company_index = None
+
+def lookup_company_ids(df_companies: pd.DataFrame, field: str = 'match_key') -> pd.Series:
+    """
+    Looks up company ids for df_companies (comp_domain, comp_linkedin, name) by
+    one of COMPANY_INDEX_FIELDS. Unmatched rows get None.
+    """
+    lookup = get_company_index()[field]
+    keys = _company_keys(df_companies)[field]
+    return pd.Series([lookup.get(key) if key else None for key in keys], index=df_companies.index, dtype=object)
+
 def process_campaign_updates(file):
     import pandas as pd
-    import re
     from sqlalchemy import text
     from app_backend.database import engine
 
-    def normalize_linkedin(url):
-        if pd.isna(url):
-            return ""
-        url = str(url).strip().lower()
-        url = re.sub(r'^https?://(www\.)?', '', url)
-        return url
+    def normalize_linkedin(urls):
+        return urls.fillna('').astype(str).str.strip().str.lower().str.replace(r'^https?://(www\.)?', '', regex=True)
+
+    def normalize_email(emails):
+        return emails.fillna('').astype(str).str.strip().str.lower()
 
     if file.name.endswith(".csv"):
         df_base = pd.read_csv(file)
@@ -1297,36 +1527,27 @@ def process_campaign_updates(file):
     df_contacts = df_contacts.merge(df_jobtitles[['index', 'jobtitle_id']], on='index', how='left')
     df_contacts.drop(columns=['jobtitle'], inplace=True)
 
-    df_contacts['emplinkedin'] = df_contacts['emplinkedin'].fillna('').apply(normalize_linkedin)
-    df_contacts['empemail'] = df_contacts['empemail'].fillna('').astype(str).str.strip().str.lower()
+    df_contacts['emplinkedin'] = normalize_linkedin(df_contacts['emplinkedin'])
+    df_contacts['empemail'] = normalize_email(df_contacts['empemail'])
 
     with engine.begin() as conn:
         result = conn.execute(text("SELECT id AS contact_id, empemail, emplinkedin, name FROM fact_contacts"))
         df_existing_contacts = pd.DataFrame(result.fetchall(), columns=['contact_id', 'empemail', 'emplinkedin', 'name'])
 
-    df_existing_contacts['emplinkedin'] = df_existing_contacts['emplinkedin'].fillna('').apply(normalize_linkedin)
-    df_existing_contacts['empemail'] = df_existing_contacts['empemail'].fillna('').astype(str).str.strip().str.lower()
+    df_existing_contacts['emplinkedin'] = normalize_linkedin(df_existing_contacts['emplinkedin'])
+    df_existing_contacts['empemail'] = normalize_email(df_existing_contacts['empemail'])
+    df_existing_contacts['composite_key'] = df_existing_contacts['empemail'] + '|' + df_existing_contacts['emplinkedin']
 
-    df_existing_contacts['composite_key'] = df_existing_contacts.apply(
-        lambda row: f"{str(row['empemail']).strip().lower()}|{normalize_linkedin(row['emplinkedin']) if pd.notna(row['emplinkedin']) else ''}",
-        axis=1
-    )
+    # Key -> contact_id lookups; later rows win on duplicate keys, like the old dict maps
+    def key_lookup(key_column):
+        return df_existing_contacts.drop_duplicates(subset=key_column, keep='last').set_index(key_column)['contact_id']
 
-    email_map = df_existing_contacts.set_index('empemail')['contact_id'].to_dict()
-    linkedin_map = df_existing_contacts.set_index('emplinkedin')['contact_id'].to_dict()
-    composite_map = df_existing_contacts.set_index('composite_key')['contact_id'].to_dict()
-
-    df_contacts['contact_id'] = None
-    for idx, row in df_contacts.iterrows():
-        email = str(row['empemail']).strip().lower() if pd.notna(row['empemail']) else ''
-        linkedin = normalize_linkedin(row['emplinkedin']) if pd.notna(row['emplinkedin']) else ''
-        key = f"{email}|{linkedin}"
-        contact_id = composite_map.get(key)
-        if not contact_id and email:
-            contact_id = email_map.get(email)
-        if not contact_id and linkedin:
-            contact_id = linkedin_map.get(linkedin)
-        df_contacts.at[idx, 'contact_id'] = contact_id
+    # Composite match first, then email, then linkedin (blank keys never match on their own)
+    contact_ids = (df_contacts['empemail'] + '|' + df_contacts['emplinkedin']).map(key_lookup('composite_key'))
+    email_ids = df_contacts['empemail'].where(df_contacts['empemail'] != '').map(key_lookup('empemail'))
+    linkedin_ids = df_contacts['emplinkedin'].where(df_contacts['emplinkedin'] != '').map(key_lookup('emplinkedin'))
+    contact_ids = contact_ids.fillna(email_ids).fillna(linkedin_ids).astype('Int64')
+    df_contacts['contact_id'] = contact_ids.astype(object).where(contact_ids.notna(), None)
 
     # ✅ MOVED BELOW emailstatus_id mapping
     df_matched_contacts = df_contacts[df_contacts['contact_id'].notna()].copy()
@@ -1434,6 +1655,7 @@ def update_matched_companies_if_different(df_matched, df_all_columns):
                 """)
                 update_data['company_id'] = company_id
                 conn.execute(update_stmt, update_data)
+        update_company_index(matched)
 
     return matched
 
@@ -1515,6 +1737,7 @@ def update_cached_contacts(changed_ids: list[int]) -> bool:
     import pandas as pd
     from datetime import datetime
     from app_backend.database import engine
+    from app_backend.migrations import apply_migrations
 
     print(f"📥 Refreshing cache for {len(changed_ids)} contact(s): {changed_ids}")
 
@@ -1523,6 +1746,9 @@ def update_cached_contacts(changed_ids: list[int]) -> bool:
         return True
 
     try:
+        # update_range_buckets below writes empsize_range/annrev_range (migration 14)
+        apply_migrations(print, engine)
+
         id_list = ', '.join(str(i) for i in changed_ids)
         query = f"SELECT * FROM Vw_full_contacts_data WHERE id IN ({id_list})"
 
@@ -1550,6 +1776,12 @@ def update_cached_contacts(changed_ids: list[int]) -> bool:
         upsert_into_table("cached_full_contacts_data")
         upsert_into_table("cached_filters_contacts_data")
 
+        from app_backend.data_version import bump_data_version
+        with engine.begin() as conn:
+            update_range_buckets(conn, df["id"].tolist())
+            add_filter_option_values(conn, df)
+            bump_data_version(conn)
+
         print(f"✅ {len(df)} record(s) upserted into both cache tables.")
         return True
 
@@ -2014,6 +2246,8 @@ def upsert_companies(df_companies: pd.DataFrame, db_session) -> pd.DataFrame:
         df_result.at[idx, 'company_id'] = company_id
         df_result.at[idx, 'id'] = company_id
 
+    update_company_index(df_result[df_result['status'].isin(['Update', 'Insert'])])
+
     print(f"✅ {len(df_update)} rows updated, {len(new_ids)} rows inserted into fact_companies.")
     return df_result
 
@@ -2551,9 +2785,7 @@ def process_uploaded_campaign_file(uploaded_file) -> dict:
         df_contacts, changed_contact_ids = upsert_contacts(df_contacts, db)
 
         from functions import update_cached_contacts
-        update_cached_contacts(changed_contact_ids)
-        import streamlit as st
-        st.cache_data.clear()
+        update_cached_contacts(changed_contact_ids)  # bumps the cache data version
 
     inserted = len(df_contacts[df_contacts['status'] == 'Insert'])
     updated = len(df_contacts[df_contacts['status'] == 'Update'])
@@ -2566,32 +2798,27 @@ def process_uploaded_campaign_file(uploaded_file) -> dict:
         'changed_ids': changed_contact_ids
     }
         
+@cached_result
 def get_filter_options_from_cache():
     """
-    Load distinct filter values from cached_filters_contacts_data table.
+    Load distinct filter values from the filter_option_values table.
+    Shared by all sessions through the result cache (reloaded when the data version changes).
+    Company names and job titles are not listed; use search_filter_options for those.
     """
-    from sqlalchemy import text
-    from app_backend.database import engine
-
-    query = text("""
-        SELECT DISTINCT country, compstate, city, companyname, industry,
-                        emailstatus, jobtitle, managementlevel
-        FROM cached_filters_contacts_data
-    """)
+    with engine.connect() as conn:
+        return load_filter_option_values(conn)
 
+@cached_result
+def get_location_hierarchy():
+    """Country/state/city triples for the cascading location filters (shared like the filter options)."""
     with engine.connect() as conn:
-        df = pd.read_sql(query, conn)
+        return load_location_hierarchy(conn)
 
-    return {
-        "country": sorted(df["country"].dropna().unique().tolist()),
-        "compstate": sorted(df["compstate"].dropna().unique().tolist()),
-        "city": sorted(df["city"].dropna().unique().tolist()),
-        "companyname": sorted(df["companyname"].dropna().unique().tolist()),
-        "industry": sorted(df["industry"].dropna().unique().tolist()),
-        "emailstatus": sorted(df["emailstatus"].dropna().unique().tolist()),
-        "jobtitle": sorted(df["jobtitle"].dropna().unique().tolist()),
-        "managementlevel": sorted(df["managementlevel"].dropna().unique().tolist()),
-    }
+@cached_result
+def search_filter_options(column, query, limit=TYPEAHEAD_LIMIT):
+    """Typeahead matches for companyname/jobtitle (top `limit`, cached per query string)."""
+    with engine.connect() as conn:
+        return search_filter_values(conn, column, query, limit)
 
 
 #--------------------------------- NEW PROCESS FUNCTIONS ---------------------------------#
@@ -2903,6 +3130,7 @@ def upsert_fact_companies_from_staging(log, engine):
             industry_id = EXCLUDED.industry_id;
         """))
         log("✅ Companies upserted.")
+        invalidate_company_index()
         # Populate company_id in staging
         conn.execute(text("""
             UPDATE staging_campaign_upload s
@@ -2972,6 +3200,11 @@ def upsert_fact_contacts_from_staging(log, engine):
 
 def refresh_cached_contacts_tables(log, engine):
     from sqlalchemy import text
+    from app_backend.migrations import apply_migrations, maintain_cache_indexes
+
+    # Step 0: Pending migrations first; the steps below need the range columns and filter value tables
+    apply_migrations(log, engine)
+
     with engine.begin() as conn:
         # Step 1: Truncate both tables
         log("🧹 Truncating cached_full_contacts_data...")
@@ -2986,7 +3219,7 @@ def refresh_cached_contacts_tables(log, engine):
                 id, name, firstname, lastname, emplinkedin, empemail, jobtitle,
                 emailstatus, companyname, comp_domain, comp_phone, comp_linkedin,
                 annrev, empsize, address, city, country, compstate, postalcode,
-                industry, managementlevel, last_updated
+                industry, managementlevel, last_updated, annrev_range, empsize_range
             )
             SELECT
                 fc.id,
@@ -3010,7 +3243,9 @@ def refresh_cached_contacts_tables(log, engine):
                 pc.name AS postalcode,
                 i.name AS industry,
                 ml.name AS managementlevel,
-                NOW() AS last_updated
+                NOW() AS last_updated,
+                """ + bucket_case_sql("annrev", "c.annrev") + """ AS annrev_range,
+                """ + bucket_case_sql("empsize", "c.empsize") + """ AS empsize_range
             FROM fact_contacts fc
                 LEFT JOIN fact_companies c ON fc.company_id = c.id
                 LEFT JOIN dim_cities city ON c.city_id = city.id
@@ -3042,3 +3277,16 @@ def refresh_cached_contacts_tables(log, engine):
             FROM cached_full_contacts_data;
         """))
         log("✅ cached_filters_contacts_data refreshed.")
+
+        # Step 3b: Distinct values per filter column
+        rebuild_filter_option_values(conn)
+        log("✅ filter_option_values and filter_location_hierarchy refreshed.")
+
+    # Step 4: Rebuild/refresh filter indexes and statistics for the new cache contents
+    maintain_cache_indexes(log, engine)
+
+    # Step 5: New data version so in-process snapshots reload
+    from app_backend.data_version import bump_data_version
+    with engine.begin() as conn:
+        version = bump_data_version(conn)
+    log(f"🔖 Cache data version is now {version}.")
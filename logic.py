@@ -5,17 +5,109 @@ from sqlalchemy import text
 from app_backend.database import engine
 import streamlit as st
 import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from functions import get_uploaded_filter_conditions
+from app_backend.range_buckets import bucket_codes
+from app_backend.snapshot import snapshot_enabled, get_snapshot
+from app_backend.migrations import apply_migrations
+from app_backend.data_version import get_data_version
+from app_backend.result_cache import cached_result, make_signature
+from app_backend.query_log import instrumented
 
 PAGE_SIZE = 100
 
-@st.cache_data(ttl=86400)
-def get_total_count(where_clause, params):
+@st.cache_resource
+def ensure_schema():
+    """Applies pending schema migrations once per server process."""
+    apply_migrations(print, engine)
+    return True
+
+def get_explorer_snapshot(suppression_file=None, tal_file=None):
+    """
+    In-process snapshot answering the filters without Postgres, or None when it is
+    disabled (EXPLORER_SNAPSHOT) or a suppression/TAL file needs the SQL path.
+    """
+    if not snapshot_enabled() or suppression_file is not None or tal_file is not None:
+        return None
+    return get_snapshot(PAGE_SIZE)
+
+# --------------------------- Count service -----------------------
+# Estimates come back immediately; exact counts run on a small background pool and
+# replace the estimate once finished. A failed count is not retried for
+# COUNT_RETRY_SECONDS (the estimate stays the answer), so polling pages don't re-run it.
+COUNT_WORKERS = 2
+MAX_TRACKED_COUNTS = 256
+COUNT_RETRY_SECONDS = 600
+
+_count_executor = ThreadPoolExecutor(max_workers=COUNT_WORKERS, thread_name_prefix="exact-count")
+_count_lock = threading.Lock()
+_exact_counts = {}    # signature -> exact count
+_count_futures = {}   # signature -> Future still counting
+_failed_counts = {}   # signature -> monotonic time the exact count failed
+
+@instrumented
+def _run_exact_count(where_clause, params):
     with engine.connect() as conn:
         query = text(f"SELECT COUNT(*) FROM cached_full_contacts_data WHERE {where_clause}")
         return conn.execute(query, params).scalar()
 
-@st.cache_data(ttl=86400)
+@cached_result
+@instrumented
+def get_estimated_count(where_clause, params):
+    """Planner row estimate for the filter (EXPLAIN, nothing is scanned)."""
+    with engine.connect() as conn:
+        query = text(f"EXPLAIN (FORMAT JSON) SELECT 1 FROM cached_full_contacts_data WHERE {where_clause}")
+        plan = conn.execute(query, params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+def _remember(tracked, key, value):
+    tracked[key] = value
+    while len(tracked) > MAX_TRACKED_COUNTS:
+        tracked.pop(next(iter(tracked)))
+
+def get_result_count(where_clause, params):
+    """
+    Returns (count, is_exact). The first call for a filter returns the planner estimate
+    and starts the exact COUNT(*) in the background; later calls return the exact value.
+    If the exact count failed, the estimate is returned until COUNT_RETRY_SECONDS have passed.
+    """
+    key = (get_data_version(), make_signature(where_clause, params))
+    with _count_lock:
+        if key in _exact_counts:
+            return _exact_counts[key], True
+
+        future = _count_futures.get(key)
+        if future is not None and future.done():
+            del _count_futures[key]
+            if future.exception() is None:
+                _remember(_exact_counts, key, future.result())
+                return _exact_counts[key], True
+            print(f"⚠️ Exact count failed, keeping the estimate: {future.exception()}")
+            _remember(_failed_counts, key, time.monotonic())
+        elif future is None:
+            failed_at = _failed_counts.get(key)
+            if failed_at is None or time.monotonic() - failed_at >= COUNT_RETRY_SECONDS:
+                _failed_counts.pop(key, None)
+                _count_futures[key] = _count_executor.submit(_run_exact_count, where_clause, dict(params))
+
+    return get_estimated_count(where_clause, params), False
+
+def count_in_progress(where_clause, params):
+    """
+    True while the exact count for the filter is queued, running or finished but not yet
+    picked up by get_result_count (the page keeps polling); False once exact or failed.
+    """
+    key = (get_data_version(), make_signature(where_clause, params))
+    with _count_lock:
+        return key in _count_futures
+
+@cached_result
+@instrumented
 # Function to get all filtered data (ignores pagination)
 def get_all_filtered_data(where_clause, params):
     with engine.connect() as conn:
@@ -27,17 +119,203 @@ def get_all_filtered_data(where_clause, params):
         # Don't use LIMIT and OFFSET for the full data export
         return pd.read_sql(query, conn, params=params)
 
-@st.cache_data(ttl=86400)
-def get_page_data(where_clause, params, offset):
+@cached_result
+@instrumented
+def get_page_boundaries(where_clause, params):
+    """
+    Keyset page index for a filter: the last id of every full page, in id order.
+    Page n (0-based) is the PAGE_SIZE rows with id > boundaries[n - 1].
+    """
+    with engine.connect() as conn:
+        query = text(f"""
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (ORDER BY id) AS rn
+                FROM cached_full_contacts_data
+                WHERE {where_clause}
+            ) numbered
+            WHERE rn % :page_size = 0
+            ORDER BY id
+        """)
+        return [row[0] for row in conn.execute(query, {**params, "page_size": PAGE_SIZE})]
+
+def get_page_after_id(where_clause, params, page_number):
+    """
+    Seek key for a page number (None for the first page), resolved from the cached boundary
+    index. Only needed to jump to an arbitrary page; ◀️/▶️ seek from the current page's ids.
+    """
+    if page_number <= 0:
+        return None
+    boundaries = get_page_boundaries(where_clause, params)
+    if not boundaries:
+        return None
+    return boundaries[min(page_number, len(boundaries)) - 1]
+
+@cached_result
+@instrumented
+def get_page_data(where_clause, params, after_id=None):
+    """Keyset (seek) page: the PAGE_SIZE rows following after_id, so every page costs the same."""
+    seek = "AND id > :after_id" if after_id is not None else ""
     with engine.connect() as conn:
         query = text(f"""
             SELECT * FROM cached_full_contacts_data
-            WHERE {where_clause}
+            WHERE ({where_clause}) {seek}
             ORDER BY id
-            OFFSET :offset LIMIT :limit
+            LIMIT :limit
         """)
-        params.update({"offset": offset, "limit": PAGE_SIZE})
-        return pd.read_sql(query, conn, params=params)
+        page_params = {**params, "limit": PAGE_SIZE}
+        if after_id is not None:
+            page_params["after_id"] = after_id
+        return pd.read_sql(query, conn, params=page_params)
+
+@cached_result
+@instrumented
+def get_page_before(where_clause, params, before_id):
+    """Keyset page backwards: the PAGE_SIZE rows preceding before_id, returned in id order."""
+    with engine.connect() as conn:
+        query = text(f"""
+            SELECT * FROM cached_full_contacts_data
+            WHERE ({where_clause}) AND id < :before_id
+            ORDER BY id DESC
+            LIMIT :limit
+        """)
+        page = pd.read_sql(query, conn, params={**params, "before_id": before_id, "limit": PAGE_SIZE})
+    return page.iloc[::-1].reset_index(drop=True)
+
+def _page_seek(page_number, page_keys):
+    """
+    (loader, seek id) for a page from the neighbouring pages already shown: the previous
+    page's last id (▶️) or the next page's first id (◀️). (None, None) when neither is known.
+    """
+    if page_number <= 0:
+        return get_page_data, None
+    if page_number - 1 in page_keys:
+        return get_page_data, page_keys[page_number - 1][1]
+    if page_number + 1 in page_keys:
+        return get_page_before, page_keys[page_number + 1][0]
+    return None, None
+
+def get_page(where_clause, params, page_number, page_keys):
+    """
+    Loads a page by seeking from a neighbouring page already shown. Only jumps to a page
+    with no known neighbour use the boundary index.
+
+    Parameters:
+    - page_keys: {page_number: (first_id, last_id)} of pages shown for this filter; updated here
+    """
+    load, seek_id = _page_seek(page_number, page_keys)
+    if load is None:
+        load, seek_id = get_page_data, get_page_after_id(where_clause, params, page_number)
+    data = load(where_clause, params, seek_id)
+    if len(data):
+        page_keys[page_number] = (int(data["id"].iloc[0]), int(data["id"].iloc[-1]))
+    return data
+
+# --------------------------- Adjacent page prefetch -----------------------
+# After a page renders, the previous/next pages are loaded on a small worker pool into
+# the result cache, so ◀️/▶️ render from memory. Each browser session has one active
+# filter signature; a new signature cancels that session's queued and unstarted work.
+# Sessions not seen for PREFETCH_SESSION_IDLE seconds (closed tabs) are dropped.
+PREFETCH_WORKERS = 2
+PREFETCH_MAX_PENDING = 8
+PREFETCH_SESSION_IDLE = 600
+
+_prefetch_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="page-prefetch")
+_prefetch_lock = threading.Lock()
+_prefetch_sessions = {}  # session id -> {"signature", "cancelled": Event, "futures": [Future], "touched"}
+
+def _prefetch_page(where_clause, params, load, seek_id, cancelled):
+    if cancelled.is_set():
+        return
+    load(where_clause, params, seek_id)
+
+def _drop_prefetch_session(state):
+    state["cancelled"].set()
+    for future in state["futures"]:
+        future.cancel()
+
+def cancel_prefetch(session_id):
+    """Cancels a session's queued prefetches; running ones finish their current query."""
+    with _prefetch_lock:
+        state = _prefetch_sessions.pop(session_id, None)
+    if state:
+        _drop_prefetch_session(state)
+
+def prefetch_adjacent_pages(session_id, where_clause, params, page_number, page_keys, total_pages=None):
+    """
+    Queues the previous and next pages of the current filter for background loading, seeking
+    from the current page's ids exactly like get_page will (never the boundary index).
+
+    Parameters:
+    - page_keys: the session's {page_number: (first_id, last_id)} as updated by get_page
+    """
+    signature = make_signature(where_clause, params)
+    now = time.monotonic()
+    with _prefetch_lock:
+        state = _prefetch_sessions.get(session_id)
+        idle = [sid for sid, s in _prefetch_sessions.items()
+                if sid != session_id and now - s["touched"] > PREFETCH_SESSION_IDLE]
+        idle_states = [_prefetch_sessions.pop(sid) for sid in idle]
+    for idle_state in idle_states:
+        _drop_prefetch_session(idle_state)
+    if state is None or state["signature"] != signature:
+        cancel_prefetch(session_id)
+        state = {"signature": signature, "cancelled": threading.Event(), "futures": []}
+
+    targets = [page_number + 1, page_number - 1]
+    targets = [p for p in targets if p >= 0 and (total_pages is None or p < total_pages)]
+    known_keys = dict(page_keys)
+
+    with _prefetch_lock:
+        state["futures"] = [f for f in state["futures"] if not f.done()]
+        state["touched"] = now
+        pending = sum(
+            1 for s in _prefetch_sessions.values() if s is not state for f in s["futures"] if not f.done()
+        ) + len(state["futures"])
+        for target in targets:
+            load, seek_id = _page_seek(target, known_keys)
+            if load is None:
+                continue  # no neighbour shown yet; a jump there resolves it on demand
+            if pending >= PREFETCH_MAX_PENDING:
+                break  # pool is busy; skip rather than queue up stale work
+            state["futures"].append(
+                _prefetch_executor.submit(_prefetch_page, where_clause, dict(params), load, seek_id, state["cancelled"])
+            )
+            pending += 1
+        _prefetch_sessions[session_id] = state
+
+FACET_COLUMNS = ["country", "compstate", "city", "industry", "managementlevel", "emailstatus"]
+
+@cached_result
+@instrumented
+def get_facet_counts(where_clause, params):
+    """
+    Contact counts per value of every sidebar facet for the current filter, in one scan
+    (GROUPING SETS, one set per facet column). Cached per filter signature.
+
+    Returns:
+    - {column: {value: count}}
+    """
+    grouping_flags = ", ".join(f"GROUPING({col}) AS g_{col}" for col in FACET_COLUMNS)
+    grouping_sets = ", ".join(f"({col})" for col in FACET_COLUMNS)
+    query = text(f"""
+        SELECT {', '.join(FACET_COLUMNS)}, {grouping_flags}, COUNT(*) AS contacts
+        FROM cached_full_contacts_data
+        WHERE {where_clause}
+        GROUP BY GROUPING SETS ({grouping_sets})
+    """)
+    with engine.connect() as conn:
+        df = pd.read_sql(query, conn, params=params)
+
+    facets = {}
+    for col in FACET_COLUMNS:
+        rows = df[(df[f"g_{col}"] == 0) & df[col].notna()]
+        facets[col] = dict(zip(rows[col], rows["contacts"].astype(int)))
+    return facets
+
+def facet_label(facet_counts, column):
+    """format_func for a sidebar multiselect: 'value (count)'."""
+    counts = facet_counts.get(column, {})
+    return lambda value: f"{value} ({counts.get(value, 0):,})"
 
 def get_full_filtered_data(where_clause, params):
     query = f"""
@@ -51,6 +329,24 @@ def get_full_filtered_data(where_clause, params):
         df = pd.DataFrame(result.fetchall(), columns=result.keys())
         return df
 
+JOBTITLE_MATCH_LIMIT = 5000  # above this many matching titles, ILIKE on the cache is cheaper than a huge IN list
+
+@cached_result
+def get_distinct_jobtitles():
+    """Distinct job titles (far fewer than contacts) for resolving keyword searches in memory."""
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT DISTINCT name FROM dim_jobtitles WHERE name IS NOT NULL")).fetchall()
+    return pd.Series([row[0] for row in rows], dtype=object)
+
+def match_jobtitles(keywords):
+    """
+    Titles containing any keyword (case-insensitive, same as ILIKE '%kw%'), matched in one
+    pass per title with a single compiled alternation over all keywords.
+    """
+    pattern = re.compile("|".join(re.escape(kw) for kw in keywords), re.IGNORECASE)
+    titles = get_distinct_jobtitles()
+    return titles[titles.str.contains(pattern, regex=True)].tolist()
+
 def build_filter_conditions(filters, suppression_file, tal_file):
     conditions = []
     params = {}
@@ -73,7 +369,12 @@ def build_filter_conditions(filters, suppression_file, tal_file):
     # Job title text search
     if filters.get("jobtitle_text"):
         keywords = [kw.strip() for kw in filters["jobtitle_text"].split(",") if kw.strip()]
-        if keywords:
+        matches = match_jobtitles(keywords) if keywords else []
+        if keywords and len(matches) <= JOBTITLE_MATCH_LIMIT:
+            # Indexed equality on the titles the keywords resolved to
+            conditions.append("jobtitle = ANY(:jobtitle_matches)")
+            params["jobtitle_matches"] = matches
+        elif keywords:
             sub_conditions = []
             for i, kw in enumerate(keywords):
                 key = f"jobtitle_text_{i}"
@@ -82,41 +383,17 @@ def build_filter_conditions(filters, suppression_file, tal_file):
             conditions.append("(" + " OR ".join(sub_conditions) + ")")
 
     add_in_condition("companyname", filters.get("companyname", []), "company")
+    add_in_condition("jobtitle", filters.get("jobtitle", []), "jobtitle")
     add_in_condition("managementlevel", filters.get("managementlevel", []), "managementlevel")
 
-    # Employee size
-    if filters.get("empsize") and filters["empsize"] != ["All"]:
-        size_conditions = []
-        for i, val in enumerate(filters["empsize"]):
-            key_min, key_max = f"empsize_min_{i}", f"empsize_max_{i}"
-            if val == "10,000+":
-                size_conditions.append(f"empsize >= :{key_min}")
-                params[key_min] = 10000
-            else:
-                low, high = val.replace(",", "").split("-")
-                size_conditions.append(f"(empsize >= :{key_min} AND empsize <= :{key_max})")
-                params[key_min] = int(low)
-                params[key_max] = int(high)
-        conditions.append("(" + " OR ".join(size_conditions) + ")")
-
-    # Revenue
-    if filters.get("annrev") and filters["annrev"] != ["All"]:
-        revenue_conditions = []
-        for val in filters["annrev"]:
-            ranges = {
-                "0 - 1M": "annrev BETWEEN 0 AND 1000000",
-                "1M - 10M": "annrev BETWEEN 1000000 AND 10000000",
-                "10M - 100M": "annrev BETWEEN 10000000 AND 100000000",
-                "100M - 500M": "annrev BETWEEN 100000000 AND 500000000",
-                "500M - 1B": "annrev BETWEEN 500000000 AND 1000000000",
-                "1B - 5B": "annrev BETWEEN 1000000000 AND 5000000000",
-                "5B - 10B": "annrev BETWEEN 5000000000 AND 10000000000",
-                "10B+": "annrev > 10000000000"
-            }
-            if val in ranges:
-                revenue_conditions.append(ranges[val])
-        if revenue_conditions:
-            conditions.append(f"({' OR '.join(revenue_conditions)})")
+    def add_range_condition(field, values):
+        # Labels -> stored bucket codes (buckets shared with the rebuild, the display and the snapshot)
+        if values and values != ["All"]:
+            add_in_condition(f"{field}_range", bucket_codes(field, values), f"{field}_range")
+
+    # Employee size / Revenue
+    add_range_condition("empsize", filters.get("empsize", []))
+    add_range_condition("annrev", filters.get("annrev", []))
 
     suppression_conditions, suppression_params = get_uploaded_filter_conditions(suppression_file, "exclude")
     tal_conditions, tal_params = get_uploaded_filter_conditions(tal_file, "include")
@@ -1,25 +1,40 @@
 import streamlit as st
 from streamlit_extras.switch_page_button import switch_page
+from st_keyup import st_keyup
 from styles.style import apply_custom_styles
-from logic import get_total_count, get_page_data, build_filter_conditions, get_full_filtered_data
-from functions import get_filter_options_from_cache
+from logic import ensure_schema, get_result_count, count_in_progress, get_facet_counts, facet_label, get_explorer_snapshot, FACET_COLUMNS, get_page, build_filter_conditions, prefetch_adjacent_pages
+from app_backend.export import export_csv_gz, export_parquet, export_csv_zip
+from app_backend.result_cache import make_signature
+from functions import get_filter_options_from_cache, get_location_hierarchy, search_filter_options
+from app_backend.filter_options import narrow_location_options
+from app_backend.query_snapshots import get_query_snapshot, materialize_query_snapshot, refresh_query_snapshot, snapshot_filter
+from filter_config import EMPSIZE_RANGES, ANNREV_RANGES
 #from functions import get_filter_options
 import json
 from app_backend.database import get_db
 from sqlalchemy import text
 import io
+import os
 import zipfile
+import uuid
+
+# Export format -> (download file name, mime type)
+EXPORT_FORMATS = {
+    "CSV (gzip)": ("filtered_data.csv.gz", "application/gzip"),
+    "Parquet": ("filtered_data.parquet", "application/vnd.apache.parquet"),
+    "ZIP (CSV parts)": ("filtered_data.zip", "application/zip"),
+}
+TYPEAHEAD_DEBOUNCE_MS = 300  # company/job title search boxes rerun this long after the last keystroke
 
 #------------------------------------ Set global UI ---------------------------------------------------
 apply_custom_styles()
 
 st.session_state["page_last"] = "Data Explorer"
+ensure_schema()
 
-if "filter_options" not in st.session_state:
-    from functions import get_filter_options_from_cache
-    st.session_state["filter_options"] = get_filter_options_from_cache()
-
-filter_options = st.session_state["filter_options"]
+# Shared across sessions by the result cache; reloaded when the data version changes
+filter_options = get_filter_options_from_cache()
+location_hierarchy = get_location_hierarchy()
 
 # @st.cache_data(ttl=86400)
 # def load_filter_options():
@@ -36,8 +51,8 @@ else:
         filter_keys = [
             "country_filter", "compstate_filter", "city_filter",
             "company_filter", "industry_filter", "empsize_filter", "revenue_filter",
-            "job_title_text_filter", "management_level_filter", "email_status_filter",
-            "suppression_file", "tal_file", "filters", "apply_filters_requested"
+            "job_title_text_filter", "job_title_filter", "management_level_filter", "email_status_filter",
+            "suppression_file", "tal_file", "filters", "apply_filters_requested", "company_picks", "job_title_picks"
         ]
         for key in filter_keys:
             if key in st.session_state:
@@ -51,6 +66,7 @@ else:
                     st.session_state[key] = False
                 else:
                     st.session_state[key] = []
+        st.session_state.pop("query_snapshot", None)
         st.session_state.page_number = 0
         st.session_state.reset_now = False
         st.session_state.reset_counter = st.session_state.get("reset_counter", 0) + 1
@@ -84,7 +100,7 @@ else:
                 "industry": st.session_state.get("industry_filter", []),
                 "empsize": st.session_state.get("empsize_filter", []),
                 "annrev": st.session_state.get("revenue_filter", []),
-                #"jobtitle": st.session_state.get("job_title_filter", []),
+                "jobtitle": st.session_state.get("job_title_filter", []),
                 "jobtitle_text": st.session_state.get("job_title_text_filter", ""),
                 "managementlevel": st.session_state.get("management_level_filter", []),
                 "emailstatus": st.session_state.get("email_status_filter", []),
@@ -104,6 +120,12 @@ else:
                     "campaign_id": campaign_id if campaign_id else None,
                     "name": default_query_name
                 })
+                # The filters changed, so a materialized snapshot of the old ones is no longer valid
+                db.execute(text("""
+                    DELETE FROM saved_query_snapshots
+                    WHERE query_id IN (SELECT id FROM dim_savedqueries WHERE name = :name)
+                """), {"name": default_query_name})
+                st.session_state.pop("query_snapshot", None)
                 db.commit()
                 st.success("✅ Query updated successfully!")
             else:
@@ -135,6 +157,9 @@ else:
             options = {row.name: row.id for row in saved_queries}
             selected_query_name = st.selectbox("Select a Query", options.keys(), key="selected_saved_query")
 
+            load_as_snapshot = st.checkbox(
+                "📌 Use materialized snapshot (stable paging; refresh on demand)", key="load_as_snapshot"
+            )
             load_button = st.button("Load")
 
             if load_button:
@@ -150,10 +175,12 @@ else:
                         st.session_state["compstate_filter"] = loaded_filters.get("compstate", [])
                         st.session_state["city_filter"] = loaded_filters.get("city", [])
                         st.session_state["company_filter"] = loaded_filters.get("companyname", [])
+                        st.session_state.pop("company_picks", None)
                         st.session_state["industry_filter"] = loaded_filters.get("industry", [])
                         st.session_state["empsize_filter"] = loaded_filters.get("empsize", [])
                         st.session_state["revenue_filter"] = loaded_filters.get("annrev", [])
-                        #st.session_state["job_title_filter"] = loaded_filters.get("jobtitle", [])
+                        st.session_state["job_title_filter"] = loaded_filters.get("jobtitle", [])
+                        st.session_state.pop("job_title_picks", None)
                         st.session_state["job_title_text_filter"] = loaded_filters.get("jobtitle_text", "")
                         st.session_state["management_level_filter"] = loaded_filters.get("managementlevel", [])
                         st.session_state["email_status_filter"] = loaded_filters.get("emailstatus", [])
@@ -161,6 +188,17 @@ else:
                         st.session_state.apply_filters_requested = True
                         st.session_state['saved_query_name'] = selected_query_name
 
+                        # Snapshot mode: page/count/export run off the stored contact ids
+                        if load_as_snapshot:
+                            snapshot_info = get_query_snapshot(selected_query_id)
+                            if snapshot_info is None:
+                                snapshot_where, snapshot_params = build_filter_conditions(loaded_filters, None, None)
+                                snapshot_info = materialize_query_snapshot(selected_query_id, snapshot_where, snapshot_params)
+                            st.session_state["query_snapshot"] = {**snapshot_info, "filters": loaded_filters}
+                        else:
+                            st.session_state.pop("query_snapshot", None)
+                        st.session_state.page_number = 0
+
                 st.session_state['load_query_visible'] = False
                 st.rerun()
         else:
@@ -172,6 +210,19 @@ else:
     else:
         st.markdown("**Saved Query Name:** New Query")
 
+    query_snapshot = st.session_state.get("query_snapshot")
+    if query_snapshot:
+        snapshot_col, refresh_col = st.columns([4, 1])
+        snapshot_col.info(
+            f"📌 Showing the materialized snapshot: {query_snapshot['row_count']:,} contacts, "
+            f"refreshed {query_snapshot['refreshed_at']:%Y-%m-%d %H:%M}."
+        )
+        if refresh_col.button("🔄 Refresh Snapshot"):
+            snapshot_where, snapshot_params = build_filter_conditions(query_snapshot["filters"], None, None)
+            snapshot_info = refresh_query_snapshot(query_snapshot["query_id"], snapshot_where, snapshot_params)
+            st.session_state["query_snapshot"] = {**snapshot_info, "filters": query_snapshot["filters"]}
+            st.rerun()
+
     PAGE_SIZE = 100
 
     if "page_number" not in st.session_state:
@@ -202,6 +253,18 @@ else:
     #     st.session_state.reset_filters_requested = False
     #     st.rerun()
 
+    # Facet counts for the currently applied filters (one GROUPING SETS scan, cached per filter)
+    facet_snapshot = get_explorer_snapshot(st.session_state.get("suppression_file"), st.session_state.get("tal_file"))
+    if query_snapshot:
+        facet_counts = get_facet_counts(*snapshot_filter(query_snapshot["query_id"], query_snapshot["revision"]))
+    elif facet_snapshot is not None:
+        facet_counts = facet_snapshot.facet_counts(st.session_state.get("filters", {}), FACET_COLUMNS)
+    else:
+        facet_where, facet_params = build_filter_conditions(
+            st.session_state.get("filters", {}), st.session_state.get("suppression_file"), st.session_state.get("tal_file")
+        )
+        facet_counts = get_facet_counts(facet_where, facet_params)
+
     # --- Sidebar Filters ---
     with st.sidebar:
         # --- BUTTONS AT THE TOP ---
@@ -214,65 +277,100 @@ else:
             "🌍 Country", 
             filter_options["country"], 
             default=st.session_state.get("country_filter", []),
+            format_func=facet_label(facet_counts, "country"),
             key=f"country_filter_widget_{st.session_state.get('reset_counter', 0)}"
             )
+            # State/city options narrow to the selected countries/states (in memory, from the cached hierarchy)
+            compstate_options, _ = narrow_location_options(
+                location_hierarchy, temp_country_filter, st.session_state.get("compstate_filter", []), [],
+                filter_options["compstate"], filter_options["city"]
+            )
             #temp_compstate_filter = st.multiselect("🏛️ Company State", filter_options["compstate"], default=st.session_state.get("compstate_filter", []))
             temp_compstate_filter = st.multiselect(
             "🏛️ Company State", 
-            filter_options["compstate"], 
+            compstate_options, 
             default=st.session_state.get("compstate_filter", []),
+            format_func=facet_label(facet_counts, "compstate"),
             key=f"compstate_filter_widget_{st.session_state.get('reset_counter', 0)}"
             )
+            _, city_options = narrow_location_options(
+                location_hierarchy, temp_country_filter, temp_compstate_filter, st.session_state.get("city_filter", []),
+                filter_options["compstate"], filter_options["city"]
+            )
             #temp_city_filter = st.multiselect("🏙️ City", filter_options["city"], default=st.session_state.get("city_filter", []))
             temp_city_filter = st.multiselect(
             "🏙️ City", 
-            filter_options["city"], 
+            city_options, 
             default=st.session_state.get("city_filter", []),
+            format_func=facet_label(facet_counts, "city"),
             key=f"city_filter_widget_{st.session_state.get('reset_counter', 0)}"
             )
 
         with st.expander("🏢 Company Filters", expanded=False):
+            # Company names are searched server-side (top matches only); picks survive between searches
+            company_search = st_keyup(
+            "🔎 Search Companies",
+            debounce=TYPEAHEAD_DEBOUNCE_MS,
+            key=f"company_search_widget_{st.session_state.get('reset_counter', 0)}"
+            ) or ""
+            company_picks = st.session_state.get("company_picks", st.session_state.get("company_filter", []))
+            company_matches = search_filter_options("companyname", company_search) if company_search.strip() else []
             #temp_company_filter = st.multiselect("🏢 Company", filter_options["companyname"], default=st.session_state.get("company_filter", []))
             temp_company_filter = st.multiselect(
             "🏢 Company", 
-            filter_options["companyname"], 
-            default=st.session_state.get("company_filter", []),
+            company_picks + [name for name in company_matches if name not in company_picks], 
+            default=company_picks,
             key=f"company_filter_widget_{st.session_state.get('reset_counter', 0)}"
             )
+            st.session_state["company_picks"] = temp_company_filter
             #temp_industry_filter = st.multiselect("🏢 Industry", filter_options["industry"], default=st.session_state.get("industry_filter", []))
             temp_industry_filter = st.multiselect(
             "🏢 Industry", 
             filter_options["industry"], 
             default=st.session_state.get("industry_filter", []),
+            format_func=facet_label(facet_counts, "industry"),
             key=f"industry_filter_widget_{st.session_state.get('reset_counter', 0)}"
             )
             #temp_empsize_filter = st.multiselect("👥 Employee Size", ["2-10", "11-50", "51-200", "200-500", "500-1000", "1000-5000", "5000-10000", "10,000+"], default=st.session_state.get("empsize_filter", []))
             temp_empsize_filter = st.multiselect(
             "👥 Employee Size", 
-            ["2-10", "11-50", "51-200", "200-500", "500-1000", "1000-5000", "5000-10000", "10,000+"],
+            list(EMPSIZE_RANGES),
             default=st.session_state.get("empsize_filter", []),
             key=f"empsize_filter_widget_{st.session_state.get('reset_counter', 0)}"
             )
             #temp_revenue_filter = st.multiselect("💰 Annual Revenue", ["0 - 1M", "1M - 10M", "10M - 100M", "100M - 500M", "500M - 1B", "1B - 5B", "5B - 10B", "10B+"], default=st.session_state.get("revenue_filter", []))
             temp_revenue_filter = st.multiselect(
             "💰 Annual Revenue", 
-            ["0 - 1M", "1M - 10M", "10M - 100M", "100M - 500M", "500M - 1B", "1B - 5B", "5B - 10B", "10B+"],
+            list(ANNREV_RANGES),
             default=st.session_state.get("revenue_filter", []),
             key=f"revenue_filter_widget_{st.session_state.get('reset_counter', 0)}"
             )
 
         with st.expander("🧑‍💼 Contact Filters", expanded=False):
             #temp_job_title_text_filter = st.text_input("🧑‍💼 Job Title (Text Search)", value=st.session_state.get("job_title_text_filter", "")).strip()
-            temp_job_title_text_filter = st.text_input(
+            temp_job_title_text_filter = (st_keyup(
             "🧑‍💼 Job Title (Text Search)", 
             value=st.session_state.get("job_title_text_filter", ""),
+            debounce=TYPEAHEAD_DEBOUNCE_MS,
             key=f"job_title_text_widget_{st.session_state.get('reset_counter', 0)}"
-            ).strip()
+            ) or "").strip()
+            # Titles matching the last keyword can be picked as exact titles; picks survive between searches
+            jobtitle_keyword = temp_job_title_text_filter.split(",")[-1].strip()
+            jobtitle_picks = st.session_state.get("job_title_picks", st.session_state.get("job_title_filter", []))
+            jobtitle_matches = search_filter_options("jobtitle", jobtitle_keyword) if jobtitle_keyword else []
+            temp_job_title_filter = st.multiselect(
+            "🧑‍💼 Job Title", 
+            jobtitle_picks + [title for title in jobtitle_matches if title not in jobtitle_picks], 
+            default=jobtitle_picks,
+            key=f"job_title_filter_widget_{st.session_state.get('reset_counter', 0)}"
+            )
+            st.session_state["job_title_picks"] = temp_job_title_filter
             #temp_managementlevel_filter = st.multiselect("🏷️ Management Level", filter_options["managementlevel"], default=st.session_state.get("management_level_filter", []))
             temp_managementlevel_filter = st.multiselect(
             "🏷️ Management Level", 
             filter_options["managementlevel"], 
             default=st.session_state.get("management_level_filter", []),
+            format_func=facet_label(facet_counts, "managementlevel"),
             key=f"management_level_filter_widget_{st.session_state.get('reset_counter', 0)}"
             )
             #temp_email_status_filter = st.multiselect("📬 Email Status", filter_options["emailstatus"], default=st.session_state.get("email_status_filter", []))
@@ -280,6 +378,7 @@ else:
             "📬 Email Status", 
             filter_options["emailstatus"], 
             default=st.session_state.get("email_status_filter", []),
+            format_func=facet_label(facet_counts, "emailstatus"),
             key=f"email_status_filter_widget_{st.session_state.get('reset_counter', 0)}"
             )
 
@@ -313,9 +412,11 @@ else:
 
                 # 🧑‍💼 Contact Filters
                 st.session_state["job_title_text_filter"] = temp_job_title_text_filter
+                st.session_state["job_title_filter"] = temp_job_title_filter
                 st.session_state["management_level_filter"] = temp_managementlevel_filter
                 st.session_state["email_status_filter"] = temp_email_status_filter
 
+                st.session_state.pop("query_snapshot", None)
                 st.session_state.apply_filters_requested = True
                 st.session_state.page_number = 0
 
@@ -332,6 +433,7 @@ else:
             "country": st.session_state.get("country_filter", []),
             "compstate": st.session_state.get("compstate_filter", []),
             "city": st.session_state.get("city_filter", []),
+            "jobtitle": st.session_state.get("job_title_filter", []),
             "jobtitle_text": st.session_state.get("job_title_text_filter", ""),
             "managementlevel": st.session_state.get("management_level_filter", []),
             "emailstatus": st.session_state.get("email_status_filter", []),
@@ -339,12 +441,17 @@ else:
         st.session_state["suppression_file"] = st.session_state.get("suppression_file")
         st.session_state["tal_file"] = st.session_state.get("tal_file")
         st.session_state.apply_filters_requested = False
+        st.rerun()  # re-render the sidebar so facet counts follow the newly applied filters
 
     filters = st.session_state.get("filters", {})
     suppression_file = st.session_state.get("suppression_file", None)
     tal_file = st.session_state.get("tal_file", None)
 
     where_clause, params = build_filter_conditions(filters, suppression_file, tal_file)
+    snapshot = get_explorer_snapshot(suppression_file, tal_file)
+    if query_snapshot:
+        where_clause, params = snapshot_filter(query_snapshot["query_id"], query_snapshot["revision"])
+        snapshot = None
 
     # --- Sidebar Options ---
     with st.sidebar:
@@ -352,6 +459,9 @@ else:
         with st.expander("⚙️ Options", expanded=False):
             save_query = st.button("💾 Save Query", use_container_width=True)
             load_query = st.button("📂 Load Query", use_container_width=True)
+            export_format = st.selectbox("Export format", list(EXPORT_FORMATS), key="export_format")
+            if export_format == "ZIP (CSV parts)":
+                export_part_rows = st.number_input("Rows per part", min_value=1000, value=100_000, step=10_000, key="export_part_rows")
             export_data = st.button("📤 Export Data", use_container_width=True)
             new_query = st.button("➕ New Query", use_container_width=True)
             logout = st.button("🔒 Logout", use_container_width=True)
@@ -363,33 +473,40 @@ else:
                 st.session_state['load_query_visible'] = True
                 st.rerun()
             if export_data:
-                total_count = get_total_count(where_clause, params)
-                st.write(f"**Filtered Total Count: {total_count}**")
-
-                if total_count > 5000:
-                    st.warning("Total Count is more than 5000, please add more filters.")
+                # Streamed through a server-side cursor into a temp file, no row cap. The download
+                # button reads the finished file into Streamlit's media store, so the file is removed here.
+                if export_format == "Parquet":
+                    export_path, export_rows = export_parquet(where_clause, params)
+                elif export_format == "ZIP (CSV parts)":
+                    export_path, export_rows = export_csv_zip(where_clause, params, part_rows=int(export_part_rows))
                 else:
-                    st.success("You're good to go!")
-                    full_data = get_full_filtered_data(where_clause, params)
-
-                    st.download_button(
-                        label="📥 Download Filtered Data",
-                        data=full_data.to_csv(index=False).encode("utf-8"),
-                        file_name="filtered_data.csv",
-                        mime="text/csv",
-                        use_container_width=True
-                    )
+                    export_path, export_rows = export_csv_gz(where_clause, params)
+                file_name, mime = EXPORT_FORMATS[export_format]
+                st.write(f"**Filtered Total Count: {export_rows}**")
+                st.success("You're good to go!")
+                try:
+                    with open(export_path, "rb") as export_file:
+                        st.download_button(
+                            label="📥 Download Filtered Data",
+                            data=export_file,
+                            file_name=file_name,
+                            mime=mime,
+                            use_container_width=True
+                        )
+                finally:
+                    os.remove(export_path)
             if new_query:
                 st.session_state['saved_query_name'] = ""
                 st.session_state['campaign_id'] = ""
                 st.session_state['save_query_visible'] = False
+                st.session_state.pop("query_snapshot", None)
 
                 # Clear filters in session state
                 for key in [
                     "country_filter", "compstate_filter", "city_filter",
                     "company_filter", "industry_filter", "empsize_filter", "revenue_filter",
-                    "job_title_text_filter", "management_level_filter", "email_status_filter",
-                    "suppression_file", "tal_file", "filters"
+                    "job_title_text_filter", "job_title_filter", "management_level_filter", "email_status_filter",
+                    "suppression_file", "tal_file", "filters", "company_picks", "job_title_picks"
                 ]:
                     if "file" in key:
                         st.session_state[key] = None
@@ -413,12 +530,52 @@ else:
                 switch_page("Home")
 
     # --- Query and Paginated Results ---
-    total_count = get_total_count(where_clause, params)
+    if query_snapshot:
+        total_count, count_is_exact = query_snapshot["row_count"], True
+    elif snapshot is not None:
+        total_count, count_is_exact = snapshot.count(filters), True
+    else:
+        total_count, count_is_exact = get_result_count(where_clause, params)
     total_pages = max(1, ((total_count - 1) // PAGE_SIZE) + 1)
-    data = get_page_data(where_clause, params, st.session_state.page_number * PAGE_SIZE)
+    if count_is_exact:
+        st.session_state.page_number = min(st.session_state.page_number, total_pages - 1)
+    if snapshot is not None:
+        after_id = snapshot.page_after_id(filters, st.session_state.page_number)
+        data = snapshot.page(filters, after_id)
+    else:
+        # Seek keys of the pages shown for this filter, so ◀️/▶️ never need the boundary index
+        page_signature = make_signature(where_clause, params)
+        if st.session_state.get("page_keys_signature") != page_signature:
+            st.session_state["page_keys_signature"] = page_signature
+            st.session_state["page_keys"] = {}
+        data = get_page(where_clause, params, st.session_state.page_number, st.session_state["page_keys"])
+    has_next_page = (st.session_state.page_number < total_pages - 1) if count_is_exact else len(data) == PAGE_SIZE
+
+    if snapshot is None:
+        # Warm the result cache with the neighbouring pages while this one is on screen
+        known_pages = total_pages if count_is_exact else st.session_state.page_number + (2 if has_next_page else 1)
+        prefetch_session = st.session_state.setdefault("prefetch_session_id", uuid.uuid4().hex)
+        prefetch_adjacent_pages(
+            prefetch_session, where_clause, params, st.session_state.page_number, st.session_state["page_keys"], known_pages
+        )
+
+    if count_is_exact:
+        st.write(f"**Total Results: {total_count}**")
+        st.write(f"Page **{st.session_state.page_number + 1}** of **{total_pages}**")
+    elif count_in_progress(where_clause, params):
+        # Estimate for now; poll until the background exact count lands (or fails), then rerun
+        @st.fragment(run_every=2)
+        def exact_count_poll():
+            st.write(f"**Total Results: ~{total_count}** (estimate, counting…)")
+            st.write(f"Page **{st.session_state.page_number + 1}** of **~{total_pages}**")
+            if get_result_count(where_clause, params)[1] or not count_in_progress(where_clause, params):
+                st.rerun()
 
-    st.write(f"**Total Results: {total_count}**")
-    st.write(f"Page **{st.session_state.page_number + 1}** of **{total_pages}**")
+        exact_count_poll()
+    else:
+        # The exact count failed; the estimate is the final answer for now
+        st.write(f"**Total Results: ~{total_count}** (estimate)")
+        st.write(f"Page **{st.session_state.page_number + 1}** of **~{total_pages}**")
     from functions import get_display_ranges
     data = get_display_ranges(data)
 
@@ -439,13 +596,21 @@ else:
             st.session_state.page_number -= 1
             st.session_state.page_changed = True
     with pagination_row[2]:
-        if st.session_state.page_number < total_pages - 1 and st.button("▶️"):
+        if has_next_page and st.button("▶️"):
             st.session_state.page_number += 1
             st.session_state.page_changed = True
     with pagination_row[3]:
-        if st.session_state.page_number < total_pages - 1 and st.button("⏭️"):
+        if count_is_exact and has_next_page and st.button("⏭️"):
             st.session_state.page_number = total_pages - 1
             st.session_state.page_changed = True
+    with pagination_row[4]:
+        if count_is_exact and total_pages > 1:
+            jump_to = st.number_input("Go to page", min_value=1, max_value=total_pages,
+                                      value=st.session_state.page_number + 1, step=1,
+                                      key=f"jump_to_page_{st.session_state.page_number}")
+            if jump_to - 1 != st.session_state.page_number:
+                st.session_state.page_number = int(jump_to) - 1
+                st.session_state.page_changed = True
 
     if st.session_state.get("page_changed", False):
         del st.session_state["page_changed"]
@@ -9,9 +9,16 @@ from functions import (
     check_uploaded_file_headers, copy_to_staging_table, clear_staging_table, log, remove_duplicates_from_staging,
     validate_and_clean_staging_data, normalize_and_enrich_dim, clean_staging_companies, clean_annrev_empsize,
     upsert_fact_companies_from_staging, clean_staging_contacts, upsert_fact_contacts_from_staging,
-    refresh_cached_contacts_tables, get_filter_options_from_cache, validate_dataset, prepare_validation_results
+    refresh_cached_contacts_tables, validate_dataset, prepare_validation_results
 )
 from app_backend.database import get_db, DB_HOST, engine
+from app_backend.data_version import bump_data_version
+from app_backend.filter_options import rebuild_filter_option_values
+from app_backend.range_buckets import update_range_buckets
+from app_backend.migrations import apply_migrations
+from app_backend.query_log import top_offenders, purge_query_log, SLOW_QUERY_MS, QUERY_LOG_RETENTION
+from app_backend.result_cache import result_cache
+from logic import ensure_schema
 
 st.set_page_config(page_title="Admin", layout="wide")
 
@@ -22,6 +29,9 @@ apply_custom_styles()
 # --------------------------- Authentication Check ----------------------------
 if not st.session_state.get("authenticated"):
     switch_page("Home")
+
+# Pending migrations (once per server process) before any refresh below touches the new tables/columns
+ensure_schema()
     
 # --------------------------- Page Visit Log Clearing ------------------------
 if st.session_state.get("page_last") != "Admin":
@@ -37,7 +47,7 @@ if "import_log_df" not in st.session_state:
 st.markdown("<h1 style='font-size: 24px;'>🔍 Admin</h1>", unsafe_allow_html=True)
 
 # --------------------------- Tabs ----------------------------
-tab1, tab2 = st.tabs(["📤 Upload New Data", "📊 Database Tables"])
+tab1, tab2, tab3 = st.tabs(["📤 Upload New Data", "📊 Database Tables", "🐢 Query Performance"])
 if "import_status" not in st.session_state:
     st.session_state.import_status = ""
 if "import_triggered" not in st.session_state:
@@ -167,12 +177,9 @@ with tab1:
                 clean_staging_contacts(engine)
                 upsert_fact_contacts_from_staging(log, engine)
                 refresh_cached_contacts_tables(log, engine)
-                log("🔄 App cache cleared. 1_Data_Explorer.py will now show latest data.")
-                st.cache_data.clear()
-                st.session_state["filter_options"] = get_filter_options_from_cache()
+                log("🔄 Cache data version bumped. 1_Data_Explorer.py will now show latest data.")
                 log("✅ All ETL steps completed for <5000 records.")
                 st.success("All records processed in the app. Data is ready.")
-                st.cache_data.clear()
 
             # -- >5000: only cleaning and warning for SQL
             else:
@@ -183,8 +190,12 @@ with tab1:
                     "You can now run the SQL script in PGAdmin to enrich and upsert the data into the main database tables."
                 )
                 if st.button("Refresh data after running SQL script"):
-                    st.cache_data.clear()
-                    st.session_state["filter_options"] = get_filter_options_from_cache()
+                    # Rebuild the filter values, then a new data version: cached Explorer results for the old data stop matching
+                    apply_migrations(log, engine)  # range columns (14) and filter value tables (8, 9)
+                    with engine.begin() as conn:
+                        update_range_buckets(conn)
+                        rebuild_filter_option_values(conn)
+                        bump_data_version(conn)
                     st.success("Cache cleared and filter options reset. The explorer page will show the latest data.")
 
         except Exception as e:
@@ -284,3 +295,34 @@ with tab2:
         data=df_filtered.to_csv(index=False).encode("utf-8"),
         file_name=f"{selected_table}_filtered.csv"
     )
+
+# --------------------------- Tab 3: Query Performance ----------------------------
+with tab3:
+    st.markdown(f"**🐢 Slowest Explorer queries** (EXPLAIN ANALYZE captured above {SLOW_QUERY_MS:,.0f} ms)")
+    if st.button("🧹 Purge old query log entries", key="purge_query_log"):
+        try:
+            st.success(f"Removed {purge_query_log()} entries older than {QUERY_LOG_RETENTION}.")
+        except Exception as e:
+            st.warning(f"Could not purge the query log: {e}")
+    try:
+        offenders = top_offenders()
+    except Exception as e:
+        offenders = None
+        st.warning(f"Query log not available yet: {e}")
+
+    if offenders is not None and offenders.empty:
+        st.info("No Explorer queries logged yet.")
+    elif offenders is not None:
+        st.dataframe(offenders.drop(columns=["slowest_explain"]), use_container_width=True)
+        for row in offenders[offenders["slowest_explain"].notna()].itertuples():
+            with st.expander(f"{row.function_name} · {row.max_ms} ms · {row.signature[:12]}"):
+                st.code(row.slowest_arguments, language="json")
+                st.code(row.slowest_explain)
+
+    st.markdown("**🧠 Result cache (this server process)**")
+    stats = result_cache.stats()
+    stat_cols = st.columns(4)
+    stat_cols[0].metric("Hit rate", f"{stats['hit_rate']:.1%}" if stats["hit_rate"] is not None else "–")
+    stat_cols[1].metric("Entries", f"{stats['entries']:,}")
+    stat_cols[2].metric("Memory", f"{stats['bytes'] / 1024 / 1024:,.1f} / {stats['max_bytes'] / 1024 / 1024:,.0f} MB")
+    stat_cols[3].metric("Evictions", f"{stats['evictions']:,}")